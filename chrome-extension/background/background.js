@@ -14,6 +14,7 @@ let flaggedDomains = new Map(); // Map of domains with flag counts
 let userToken = null; // JWT token for authenticated requests
 let extensionId = null; // Unique ID for this extension instance
 let lastSyncTime = null; // Timestamp of last sync
+let syncCursor = null; // Opaque delta-sync cursor returned by the backend
 
 // Initialize extension
 async function initialize() {
@@ -49,6 +50,7 @@ async function loadStoredData() {
     'userToken',
     'extensionId',
     'lastSyncTime',
+    'syncCursor',
     'settings'
   ]);
   
@@ -81,6 +83,9 @@ async function loadStoredData() {
   // Set last sync time if available
   lastSyncTime = data.lastSyncTime || null;
   
+  // Set sync cursor if available
+  syncCursor = data.syncCursor || null;
+  
   // Load settings or use defaults
   settings = data.settings || DEFAULT_SETTINGS;
   
@@ -135,6 +140,7 @@ async function syncWithBackend() {
     const requestData = {
       extensionId: extensionId,
       lastSyncTime: lastSyncTime,
+      cursor: syncCursor,
       settings: {
         alertLevel: settings.alertLevel,
         autoSync: settings.autoSync,
@@ -151,10 +157,17 @@ async function syncWithBackend() {
       headers['Authorization'] = `Bearer ${userToken}`;
     }
     
-    // Make API call to backend
-    const response = await makeApiCall('/extension/sync', 'POST', requestData, headers);
+    // Make API call to backend, following the cursor until all changes are received
+    let response = await makeApiCall('/extension/sync', 'POST', requestData, headers);
     
-    if (response.success) {
+    while (response.success) {
+      // Drop URLs whose content was deleted
+      if (response.data.deletedUrls && Array.isArray(response.data.deletedUrls)) {
+        for (const url of response.data.deletedUrls) {
+          flaggedUrls.delete(url);
+        }
+      }
+      
       // Update flagged URLs
       if (response.data.flaggedUrls && Array.isArray(response.data.flaggedUrls)) {
         for (const item of response.data.flaggedUrls) {
@@ -184,6 +197,16 @@ async function syncWithBackend() {
         };
       }
       
+      // Remember where this sync left off
+      if (response.data.cursor) {
+        syncCursor = response.data.cursor;
+      }
+      
+      if (response.data.hasMore && syncCursor) {
+        response = await makeApiCall('/extension/sync', 'POST', { ...requestData, cursor: syncCursor }, headers);
+        continue;
+      }
+      
       // Update last sync time
       lastSyncTime = new Date().toISOString();
       
@@ -192,9 +215,9 @@ async function syncWithBackend() {
       
       console.log('Fake News Detector: Sync completed successfully');
       return true;
-    } else {
-      throw new Error(mockResponse.message || 'Sync failed');
     }
+    
+    throw new Error(response.message || 'Sync failed');
   } catch (error) {
     console.error('Fake News Detector: Sync error', error);
     return false;
@@ -209,6 +232,7 @@ async function saveDataToStorage() {
       flaggedDomains: JSON.stringify(Array.from(flaggedDomains.entries())),
       userToken,
       lastSyncTime,
+      syncCursor,
       settings
     });
     console.log('Fake News Detector: Saved data to storage');
@@ -4,17 +4,22 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from datetime import timedelta
-from flask import Flask, send_from_directory
+from flask import Flask
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from dotenv import load_dotenv
 
+# Load environment variables (before importing the routes, which read their settings at import time)
+load_dotenv()
+
 from src.models import db
-from src.routes import user_bp, auth_bp, flagged_content_bp, verification_bp, statistics_bp
+from src.routes import user_bp, auth_bp, flagged_content_bp, verification_bp, statistics_bp, extension_bp, domain_bp, export_bp
 from src.routes.google_auth import google_auth_bp, oauth
-
-# Load environment variables
-load_dotenv()
+from src.routes.auth import start_api_key_usage_flusher
+from src.routes.flagged_content import load_url_filter, load_trending, start_ingest_worker
+from src.routes.statistics import start_statistics_refresher, start_statistics_scheduler
+from src.routes.verification import start_review_queue_refresher
+from src.utils.static_files import SENDFILE_MODES, StaticManifest, static_file_response
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 
@@ -38,6 +43,9 @@ app.register_blueprint(auth_bp, url_prefix='/api/auth')
 app.register_blueprint(flagged_content_bp, url_prefix='/api')
 app.register_blueprint(verification_bp, url_prefix='/api')
 app.register_blueprint(statistics_bp, url_prefix='/api')
+app.register_blueprint(extension_bp, url_prefix='/api')
+app.register_blueprint(domain_bp, url_prefix='/api')
+app.register_blueprint(export_bp, url_prefix='/api')
 app.register_blueprint(google_auth_bp, url_prefix='/api/auth')
 
 # Configure database
@@ -49,10 +57,39 @@ db.init_app(app)
 with app.app_context():
     db.create_all()
     
+    # Build the flagged URL filter used by check-url
+    load_url_filter()
+    
+    # Seed the trending windows with recent flags
+    load_trending()
+    
     # Create screenshots directory
     screenshots_dir = os.path.join(app.static_folder, 'screenshots')
     os.makedirs(screenshots_dir, exist_ok=True)
 
+# Index the static folder once so serving a file needs no filesystem checks.
+# Set STATIC_SENDFILE_MODE to x-accel-redirect (nginx) or x-sendfile (Apache, lighttpd)
+# to let the front proxy send the file contents.
+STATIC_SENDFILE_MODE = os.getenv('STATIC_SENDFILE_MODE', '').lower() or None
+if STATIC_SENDFILE_MODE and STATIC_SENDFILE_MODE not in SENDFILE_MODES:
+    raise ValueError(f"STATIC_SENDFILE_MODE must be one of: {', '.join(SENDFILE_MODES)}")
+STATIC_ACCEL_PREFIX = os.getenv('STATIC_ACCEL_PREFIX', '/protected-static/')
+static_manifest = StaticManifest(app.static_folder)
+static_manifest.build()
+
+# Start the write-behind flag ingestion worker (only when INGEST_ASYNC is enabled)
+start_ingest_worker(app)
+
+# Start writing buffered API key last_used_at times
+start_api_key_usage_flusher(app)
+
+# Start the daily statistics snapshot scheduler and the summary snapshot refresher
+start_statistics_scheduler(app)
+start_statistics_refresher(app)
+
+# Start recomputing review queue priorities and releasing expired claims
+start_review_queue_refresher(app)
+
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
@@ -60,14 +97,20 @@ def serve(path):
     if static_folder_path is None:
             return "Static folder not configured", 404
 
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
-            return "index.html not found", 404
+    if path != "":
+        entry = static_manifest.get(path)
+        if entry is not None:
+            response = static_file_response(static_manifest, entry, STATIC_SENDFILE_MODE, STATIC_ACCEL_PREFIX)
+            if response is not None:
+                return response
+
+    # Unknown paths are client-side routes of the single page app
+    index_entry = static_manifest.get('index.html')
+    if index_entry is not None:
+        response = static_file_response(static_manifest, index_entry, STATIC_SENDFILE_MODE, STATIC_ACCEL_PREFIX)
+        if response is not None:
+            return response
+    return "index.html not found", 404
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,229 @@
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from flask import Flask, current_app
+from dotenv import load_dotenv
+from sqlalchemy import bindparam, case, func, inspect, select, text
+
+from src.models import db, FlaggedContent, Flag, Verification, DeletedContent, DomainStats, FlagRollup, StatisticsCounter
+from src.models.domain_stats import STATUS_COLUMNS
+from src.models.flagged_content import SEARCH_EXTENSION_DDL, SEARCH_DDL
+from src.utils.screenshots import remove_screenshot_files
+from src.utils.urls import hash_url, registrable_domain
+
+# Load environment variables
+load_dotenv()
+
+# Rows hashed (or duplicate groups merged) per transaction
+MIGRATE_BATCH_SIZE = int(os.getenv('MIGRATE_BATCH_SIZE', '1000'))
+
+# Create Flask app (same database settings as main.py)
+app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+app.config['SQLALCHEMY_DATABASE_URI'] = f"postgresql://{os.getenv('DB_USERNAME', 'root')}:{os.getenv('DB_PASSWORD', 'password')}@{os.getenv('DB_HOST', 'localhost')}:{os.getenv('DB_PORT', '5432')}/{os.getenv('DB_NAME', 'fake_news_detector')}"
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+db.init_app(app)
+
+def add_missing_columns():
+    """Add model columns that existing tables don't have yet (url_hash, domain, review_priority, ...).
+    
+    Columns are added as nullable; required ones are tightened once they have been backfilled.
+    """
+    print("Adding missing columns...")
+    
+    dialect = db.engine.dialect
+    preparer = dialect.identifier_preparer
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue  # Created by create_all()
+        
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            
+            definition = f'{preparer.quote(column.name)} {column.type.compile(dialect=dialect)}'
+            for foreign_key in column.foreign_keys:
+                definition += f' REFERENCES {preparer.format_table(foreign_key.column.table)} ({preparer.quote(foreign_key.column.name)})'
+            
+            db.session.execute(text(f'ALTER TABLE {preparer.format_table(table)} ADD COLUMN {definition}'))
+            print(f"  {table.name}.{column.name}")
+    
+    db.session.commit()
+
+def backfill_url_hashes():
+    """Compute url_hash and domain for content created before they existed. Returns the number of rows."""
+    print("Hashing flagged content URLs...")
+    
+    table = FlaggedContent.__table__
+    statement = table.update() \
+        .where(table.c.id == bindparam('row_id')) \
+        .values(url_hash=bindparam('row_hash'), domain=bindparam('row_domain'))
+    
+    hashed = 0
+    last_id = 0
+    while True:
+        # Walk the table in id order, so each batch is a short transaction
+        rows = db.session.execute(
+            select(table.c.id, table.c.url)
+            .where(table.c.url_hash.is_(None), table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(MIGRATE_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        
+        db.session.execute(statement, [
+            {'row_id': row_id, 'row_hash': hash_url(url), 'row_domain': registrable_domain(url)}
+            for row_id, url in rows
+        ])
+        db.session.commit()
+        
+        hashed += len(rows)
+        last_id = rows[-1][0]
+        print(f"  {hashed} rows")
+    
+    return hashed
+
+def merge_group(content_ids):
+    """Merge flagged content rows that share a canonical URL into the oldest one. Returns the removed screenshots."""
+    rows = FlaggedContent.query.filter(FlaggedContent.id.in_(content_ids)).order_by(FlaggedContent.id).all()
+    survivor, duplicates = rows[0], rows[1:]
+    duplicate_ids = [row.id for row in duplicates]
+    
+    # Keep every flag and verification, now pointing at the surviving row
+    Flag.query.filter(Flag.flagged_content_id.in_(duplicate_ids)) \
+        .update({Flag.flagged_content_id: survivor.id}, synchronize_session=False)
+    Verification.query.filter(Verification.flagged_content_id.in_(duplicate_ids)) \
+        .update({Verification.flagged_content_id: survivor.id}, synchronize_session=False)
+    
+    survivor.flag_count = sum(row.flag_count or 0 for row in rows)
+    for field in ['title', 'platform', 'description', 'screenshot_path']:
+        if not getattr(survivor, field):
+            setattr(survivor, field, next((getattr(row, field) for row in duplicates if getattr(row, field)), None))
+    
+    # A pending survivor takes the most recent decision made on any of its duplicates
+    if survivor.verification_status == 'pending':
+        decided = [row for row in duplicates if row.verification_status != 'pending']
+        if decided:
+            survivor.verification_status = max(decided, key=lambda row: row.updated_at or row.created_at).verification_status
+    
+    # Tombstones let syncing extensions drop the merged URLs
+    for row in duplicates:
+        db.session.add(DeletedContent(flagged_content_id=row.id, url=row.url, url_hash=row.url_hash))
+    
+    removed_screenshots = [row.screenshot_path for row in duplicates if row.screenshot_path and row.screenshot_path != survivor.screenshot_path]
+    db.session.flush()
+    FlaggedContent.query.filter(FlaggedContent.id.in_(duplicate_ids)).delete(synchronize_session=False)
+    return removed_screenshots
+
+def merge_duplicates():
+    """Merge content whose URLs only differed before canonicalization. Returns the number of rows removed."""
+    print("Merging duplicate URLs...")
+    
+    groups = db.session.execute(
+        select(FlaggedContent.url_hash)
+        .group_by(FlaggedContent.url_hash)
+        .having(func.count() > 1)
+        .order_by(FlaggedContent.url_hash)
+    ).scalars().all()
+    
+    removed = 0
+    for start in range(0, len(groups), MIGRATE_BATCH_SIZE):
+        removed_screenshots = []
+        for url_hash in groups[start:start + MIGRATE_BATCH_SIZE]:
+            content_ids = db.session.execute(
+                select(FlaggedContent.id).where(FlaggedContent.url_hash == url_hash)
+            ).scalars().all()
+            removed_screenshots.extend(merge_group(content_ids))
+            removed += len(content_ids) - 1
+        db.session.commit()
+        
+        # Screenshots from before content-addressed storage were never shared
+        for screenshot_path in removed_screenshots:
+            remove_screenshot_files(current_app.static_folder, screenshot_path)
+    
+    print(f"  {removed} rows merged into {len(groups)}")
+    return removed
+
+def require_url_hashes():
+    """Make url_hash NOT NULL, as declared by the model (SQLite can't alter columns, so it is skipped there)."""
+    if db.engine.dialect.name != 'postgresql':
+        return
+    
+    preparer = db.engine.dialect.identifier_preparer
+    db.session.execute(text(f'ALTER TABLE {preparer.format_table(FlaggedContent.__table__)} ALTER COLUMN url_hash SET NOT NULL'))
+    db.session.commit()
+
+def create_missing_indexes():
+    """Create the indexes (including the unique url_hash index) and search support missing from existing tables."""
+    print("Creating missing indexes...")
+    
+    inspector = inspect(db.engine)
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(connection)
+                    print(f"  {index.name}")
+        
+        if connection.dialect.name == 'postgresql':
+            connection.execute(SEARCH_EXTENSION_DDL)
+            for ddl in SEARCH_DDL:
+                connection.execute(ddl.against(FlaggedContent.__table__))
+
+def rebuild_domain_stats():
+    """Recount the per-domain aggregates from the flagged content table."""
+    print("Rebuilding domain statistics...")
+    
+    DomainStats.query.delete(synchronize_session=False)
+    
+    status_column = FlaggedContent.verification_status
+    rows = db.session.execute(
+        select(
+            FlaggedContent.domain,
+            func.count(),
+            func.coalesce(func.sum(FlaggedContent.flag_count), 0),
+            *[func.sum(case((status_column == status, 1), else_=0)) for status in STATUS_COLUMNS]
+        )
+        .where(FlaggedContent.domain.isnot(None))
+        .group_by(FlaggedContent.domain)
+    ).all()
+    
+    for domain, content_count, flag_count, *status_counts in rows:
+        db.session.add(DomainStats(
+            domain=domain,
+            content_count=content_count,
+            flag_count=flag_count,
+            **{column: count or 0 for column, count in zip(STATUS_COLUMNS.values(), status_counts)}
+        ))
+    db.session.commit()
+
+def main():
+    """Bring a database created by an older version up to the current schema. Safe to run again."""
+    with app.app_context():
+        # Create tables that don't exist yet
+        db.create_all()
+        
+        add_missing_columns()
+        backfill_url_hashes()
+        merge_duplicates()
+        require_url_hashes()
+        create_missing_indexes()
+        
+        # Aggregates maintained at write time start out from the existing rows
+        rebuild_domain_stats()
+        print("Rebuilding flag rollups...")
+        FlagRollup.rebuild()
+        db.session.commit()
+        print("Reconciling statistics counters...")
+        StatisticsCounter.reconcile()
+        
+        print("Database migrated successfully!")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,12 @@
 from src.models.user import db, User
 from src.models.flagged_content import FlaggedContent, Flag
 from src.models.verification import Verification
-from src.models.statistics import Statistics
+from src.models.statistics import Statistics, StatisticsCounter, ContentBreakdown
 from src.models.api_key import ApiKey
+from src.models.deleted_content import DeletedContent
+from src.models.domain_stats import DomainStats
+from src.models.screenshot import Screenshot
+from src.models.flag_rollup import FlagRollup
 
 __all__ = [
     'db',
@@ -11,6 +15,12 @@ __all__ = [
     'Flag',
     'Verification',
     'Statistics',
-    'ApiKey'
+    'StatisticsCounter',
+    'ContentBreakdown',
+    'ApiKey',
+    'DeletedContent',
+    'DomainStats',
+    'Screenshot',
+    'FlagRollup'
 ]
 
@@ -1,5 +1,6 @@
 from datetime import datetime
 import secrets
+from sqlalchemy import case
 from src.models.user import db
 
 class ApiKey(db.Model):
@@ -10,6 +11,10 @@ class ApiKey(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_used_at = db.Column(db.DateTime, nullable=True)
     
+    # Per-key request quota; NULL uses the default API key limits
+    rate_limit_per_minute = db.Column(db.Integer, nullable=True)
+    rate_limit_burst = db.Column(db.Integer, nullable=True)
+    
     # Foreign keys
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     
@@ -19,6 +24,15 @@ class ApiKey(db.Model):
     def __repr__(self):
         return f'<ApiKey {self.id}: {self.name}>'
     
+    @classmethod
+    def record_last_used(cls, last_used):
+        """Apply buffered usage times ({api_key_id: datetime}) with a single UPDATE and commit."""
+        cls.query.filter(cls.id.in_(list(last_used))).update(
+            {cls.last_used_at: case(last_used, value=cls.id, else_=cls.last_used_at)},
+            synchronize_session=False
+        )
+        db.session.commit()
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -26,6 +40,8 @@ class ApiKey(db.Model):
             'is_active': self.is_active,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'last_used_at': self.last_used_at.isoformat() if self.last_used_at else None,
+            'rate_limit_per_minute': self.rate_limit_per_minute,
+            'rate_limit_burst': self.rate_limit_burst,
             'user_id': self.user_id
         }
 
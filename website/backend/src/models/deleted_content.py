@@ -0,0 +1,22 @@
+from datetime import datetime
+from src.models.user import db
+
+class DeletedContent(db.Model):
+    """Tombstone left behind when flagged content is deleted, so syncing clients can drop it."""
+    id = db.Column(db.Integer, primary_key=True)
+    flagged_content_id = db.Column(db.Integer, nullable=False)
+    url = db.Column(db.String(2048), nullable=False)
+    url_hash = db.Column(db.String(64), nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f'<DeletedContent {self.flagged_content_id}: {self.url}>'
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'flagged_content_id': self.flagged_content_id,
+            'url': self.url,
+            'url_hash': self.url_hash,
+            'deleted_at': self.deleted_at.isoformat() if self.deleted_at else None
+        }
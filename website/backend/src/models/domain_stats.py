@@ -0,0 +1,75 @@
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+
+# Verification status -> counter column
+STATUS_COLUMNS = {
+    'pending': 'pending_count',
+    'verified_fake': 'verified_fake_count',
+    'verified_misleading': 'verified_misleading_count',
+    'verified_true': 'verified_true_count'
+}
+
+class DomainStats(db.Model):
+    """Per-domain aggregate of flagged content, maintained in the same transaction as flags and verifications."""
+    id = db.Column(db.Integer, primary_key=True)
+    domain = db.Column(db.String(253), unique=True, index=True, nullable=False)
+    content_count = db.Column(db.Integer, default=0, nullable=False)
+    flag_count = db.Column(db.Integer, default=0, nullable=False, index=True)
+    pending_count = db.Column(db.Integer, default=0, nullable=False)
+    verified_fake_count = db.Column(db.Integer, default=0, nullable=False, index=True)
+    verified_misleading_count = db.Column(db.Integer, default=0, nullable=False)
+    verified_true_count = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<DomainStats {self.domain}: {self.flag_count} flags>'
+    
+    @classmethod
+    def record(cls, domain, content=0, flags=0, status_changes=None):
+        """Apply counter deltas for a domain in SQL, creating its row on first use.
+        
+        status_changes maps verification statuses to deltas, e.g. {'pending': -1, 'verified_fake': 1}.
+        Nothing is committed; the caller's transaction covers the update.
+        """
+        if not domain:
+            return
+        
+        values = {}
+        if content:
+            values[cls.content_count] = cls.content_count + content
+        if flags:
+            values[cls.flag_count] = cls.flag_count + flags
+        for status, delta in (status_changes or {}).items():
+            column = STATUS_COLUMNS.get(status)
+            if column and delta:
+                attribute = getattr(cls, column)
+                values[attribute] = values.get(attribute, attribute) + delta
+        
+        if not values:
+            return
+        values[cls.updated_at] = datetime.utcnow()
+        
+        updated = cls.query.filter_by(domain=domain).update(values, synchronize_session=False)
+        if updated:
+            return
+        
+        # First flag for this domain; another request may be creating the row concurrently
+        try:
+            with db.session.begin_nested():
+                db.session.add(cls(domain=domain))
+        except IntegrityError:
+            pass
+        cls.query.filter_by(domain=domain).update(values, synchronize_session=False)
+    
+    def to_dict(self):
+        return {
+            'domain': self.domain,
+            'content_count': self.content_count,
+            'flag_count': self.flag_count,
+            'pending_count': self.pending_count,
+            'verified_fake_count': self.verified_fake_count,
+            'verified_misleading_count': self.verified_misleading_count,
+            'verified_true_count': self.verified_true_count,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
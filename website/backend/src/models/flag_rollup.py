@@ -0,0 +1,92 @@
+from collections import Counter
+from src.models.flagged_content import FlaggedContent, Flag, UPSERT_INSERTS
+from src.models.user import db
+
+# Rollup keys upserted per INSERT statement
+ROLLUP_UPSERT_BATCH_SIZE = 1000
+
+class FlagRollup(db.Model):
+    """Hourly flag counts by platform, content type and reason, kept up to date as flags are ingested.
+    
+    Rollups count flags as they arrive, so deleting flagged content later doesn't remove its
+    flags from past buckets.
+    """
+    __table_args__ = (
+        db.UniqueConstraint('bucket', 'platform', 'content_type', 'reason', name='uq_flag_rollup_key'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    bucket = db.Column(db.DateTime, nullable=False, index=True)  # Start of the UTC hour
+    platform = db.Column(db.String(100), nullable=False, default='')  # Empty when the platform is unknown
+    content_type = db.Column(db.String(50), nullable=False)
+    reason = db.Column(db.String(100), nullable=False)
+    flag_count = db.Column(db.Integer, default=0, nullable=False)
+    
+    def __repr__(self):
+        return f'<FlagRollup {self.bucket} {self.platform}/{self.content_type}/{self.reason}: {self.flag_count}>'
+    
+    @staticmethod
+    def bucket_for(timestamp):
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    
+    @classmethod
+    def record(cls, flags):
+        """Add flags, given as (created_at, platform, content_type, reason) tuples, to their hourly buckets.
+        
+        Uses INSERT ... ON CONFLICT DO UPDATE, one statement per ROLLUP_UPSERT_BATCH_SIZE keys.
+        Nothing is committed; the caller's transaction covers the update.
+        """
+        counts = Counter(
+            (cls.bucket_for(created_at), platform or '', content_type, reason)
+            for created_at, platform, content_type, reason in flags
+        )
+        if not counts:
+            return
+        
+        dialect = db.session.get_bind().dialect.name
+        insert = UPSERT_INSERTS.get(dialect)
+        if insert is None:
+            raise NotImplementedError(f'Atomic upsert is not supported on {dialect}')
+        
+        # Keys in a fixed order so concurrent batches lock rows in the same order
+        values = [
+            {'bucket': bucket, 'platform': platform, 'content_type': content_type, 'reason': reason, 'flag_count': count}
+            for (bucket, platform, content_type, reason), count in sorted(counts.items())
+        ]
+        for start in range(0, len(values), ROLLUP_UPSERT_BATCH_SIZE):
+            statement = insert(cls).values(values[start:start + ROLLUP_UPSERT_BATCH_SIZE])
+            db.session.execute(statement.on_conflict_do_update(
+                index_elements=[cls.bucket, cls.platform, cls.content_type, cls.reason],
+                set_={'flag_count': cls.flag_count + statement.excluded.flag_count}
+            ))
+    
+    @classmethod
+    def rebuild(cls, batch_size=10000):
+        """Recompute every bucket from the flags table (to populate rollups for existing data).
+        
+        Nothing is committed.
+        """
+        cls.query.delete(synchronize_session=False)
+        
+        rows = db.session.query(Flag.created_at, FlaggedContent.platform, FlaggedContent.content_type, Flag.reason) \
+            .join(FlaggedContent, Flag.flagged_content_id == FlaggedContent.id) \
+            .filter(Flag.created_at.isnot(None)) \
+            .order_by(Flag.created_at) \
+            .yield_per(batch_size)
+        
+        batch = []
+        for row in rows:
+            batch.append(tuple(row))
+            if len(batch) >= batch_size:
+                cls.record(batch)
+                batch = []
+        cls.record(batch)
+    
+    def to_dict(self):
+        return {
+            'bucket': self.bucket.isoformat() if self.bucket else None,
+            'platform': self.platform or None,
+            'content_type': self.content_type,
+            'reason': self.reason,
+            'flag_count': self.flag_count
+        }
@@ -1,9 +1,32 @@
 from datetime import datetime
+from sqlalchemy import DDL, Boolean, event, func, literal_column, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import validates
+from src.models.domain_stats import DomainStats
 from src.models.user import db
+from src.utils.urls import hash_url, registrable_domain
+
+# Dialect-specific INSERT constructs that support ON CONFLICT
+UPSERT_INSERTS = {
+    'postgresql': postgresql_insert,
+    'sqlite': sqlite_insert
+}
 
 class FlaggedContent(db.Model):
+    __table_args__ = (
+        # Supports keyset scans over recently changed content (extension sync)
+        db.Index('ix_flagged_content_updated_at_id', 'updated_at', 'id'),
+        # Supports newest-first keyset pagination of listings
+        db.Index('ix_flagged_content_created_at_id', 'created_at', 'id'),
+        # Supports picking the highest priority pending content (review queue)
+        db.Index('ix_flagged_content_review_queue', 'verification_status', 'review_priority'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     url = db.Column(db.String(2048), nullable=False)
+    url_hash = db.Column(db.String(64), unique=True, index=True, nullable=False)  # SHA-256 of the canonical URL
+    domain = db.Column(db.String(253), nullable=True, index=True)  # Registrable domain, e.g. bbc.co.uk
     title = db.Column(db.String(255), nullable=True)
     content_type = db.Column(db.String(50), nullable=False)  # article, social_post, video, image, advertisement
     platform = db.Column(db.String(100), nullable=True)  # Facebook, Twitter, etc.
@@ -11,12 +34,187 @@ class FlaggedContent(db.Model):
     screenshot_path = db.Column(db.String(255), nullable=True)
     verification_status = db.Column(db.String(50), default='pending')  # pending, verified_fake, verified_misleading, verified_true
     flag_count = db.Column(db.Integer, default=1)
+    review_priority = db.Column(db.Float, nullable=True)  # Set by refresh_review_priority(); higher is reviewed first
+    claimed_by_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)  # Moderator holding the review claim
+    claim_expires_at = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     flags = db.relationship('Flag', backref='flagged_content', lazy=True, cascade="all, delete-orphan")
     
+    @validates('url')
+    def validate_url(self, key, url):
+        # Keep the lookup hash and domain in sync with the URL
+        self.url_hash = hash_url(url)
+        self.domain = registrable_domain(url)
+        return url
+    
+    @classmethod
+    def _upsert_statement(cls, rows, now):
+        """Build INSERT ... ON CONFLICT (url_hash) DO UPDATE adding each row's flag_count to the existing one."""
+        dialect = db.session.get_bind().dialect.name
+        insert = UPSERT_INSERTS.get(dialect)
+        if insert is None:
+            raise NotImplementedError(f'Atomic upsert is not supported on {dialect}')
+        
+        values = [
+            {
+                'url_hash': hash_url(row['url']),
+                'domain': registrable_domain(row['url']),
+                'verification_status': 'pending',
+                'created_at': now,
+                'updated_at': now,
+                'title': None,
+                'platform': None,
+                'description': None,
+                **row
+            }
+            for row in rows
+        ]
+        
+        statement = insert(cls).values(values)
+        return statement.on_conflict_do_update(
+            index_elements=[cls.url_hash],
+            set_={
+                'flag_count': cls.flag_count + statement.excluded.flag_count,
+                'updated_at': now
+            }
+        )
+    
+    @classmethod
+    def _upsert_inserted(cls, now):
+        """Column expression telling, in the upsert's RETURNING, whether a row was inserted or updated."""
+        if db.session.get_bind().dialect.name == 'postgresql':
+            # Rows inserted by the statement have no deleting/locking transaction yet
+            return literal_column('xmax = 0', Boolean).label('inserted')
+        # The conflict update never touches created_at, so only inserted rows carry the statement timestamp
+        return (cls.created_at == now).label('inserted')
+    
+    @classmethod
+    def upsert(cls, url, content_type, flag_increment=1, **fields):
+        """Insert content for a URL or add flag_increment to its flag count, in one atomic statement.
+        
+        Uses INSERT ... ON CONFLICT (url_hash) DO UPDATE so concurrent submissions for the same
+        URL never lose increments or create duplicate rows. Returns (flagged_content, created).
+        Nothing is committed; the caller's transaction covers the change.
+        """
+        now = datetime.utcnow()
+        statement = cls._upsert_statement([
+            {'url': url, 'content_type': content_type, 'flag_count': flag_increment, **fields}
+        ], now).returning(cls, cls._upsert_inserted(now))
+        
+        flagged_content, inserted = db.session.execute(
+            statement,
+            execution_options={'populate_existing': True}
+        ).one()
+        return flagged_content, bool(inserted)
+    
+    @classmethod
+    def upsert_many(cls, rows):
+        """Upsert many URLs in one statement. Each row needs url, content_type and flag_count (the increment).
+        
+        URLs must be unique by canonical hash within a call.
+        Returns {url_hash: (id, domain, created, content_type, platform)} with the stored values.
+        """
+        if not rows:
+            return {}
+        
+        now = datetime.utcnow()
+        statement = cls._upsert_statement(rows, now).returning(
+            cls.id, cls.url_hash, cls.domain, cls._upsert_inserted(now), cls.content_type, cls.platform
+        )
+        
+        return {
+            url_hash: (content_id, domain, bool(inserted), content_type, platform)
+            for content_id, url_hash, domain, inserted, content_type, platform in db.session.execute(statement)
+        }
+    
+    @classmethod
+    def refresh_review_priority(cls, velocity_window, velocity_weight=5.0, domain_weight=1.0, since=None,
+                                after_id=None, up_to_id=None):
+        """Recompute review_priority for pending content in one UPDATE. Returns the number of rows updated.
+        
+        priority = (flag_count + velocity_weight * flags within velocity_window)
+                   * (1 + domain_weight * share of the domain's verified content found fake or misleading)
+        
+        With `since`, only content updated since then (or never prioritized) is recomputed: new flags
+        bump updated_at, so that covers every row whose recent flag count can have changed as long as
+        `since` reaches back one velocity window before the previous run. `after_id` and `up_to_id`
+        limit the update to after_id < id <= up_to_id, to work through the table in batches.
+        Nothing is committed.
+        """
+        now = datetime.utcnow()
+        recent_flags = select(func.count()) \
+            .where(Flag.flagged_content_id == cls.id, Flag.created_at >= now - velocity_window) \
+            .scalar_subquery()
+        
+        confirmed = DomainStats.verified_fake_count + DomainStats.verified_misleading_count
+        domain_risk = select(db.cast(confirmed, db.Float) / (confirmed + DomainStats.verified_true_count + 1)) \
+            .where(DomainStats.domain == cls.domain) \
+            .scalar_subquery()
+        
+        statement = update(cls).where(cls.verification_status == 'pending')
+        if since is not None:
+            statement = statement.where(or_(cls.updated_at >= since, cls.review_priority.is_(None)))
+        if after_id is not None:
+            statement = statement.where(cls.id > after_id)
+        if up_to_id is not None:
+            statement = statement.where(cls.id <= up_to_id)
+        
+        # Keep updated_at as it is: prioritizing isn't a change clients need to sync
+        statement = statement.values(
+            review_priority=(cls.flag_count + velocity_weight * recent_flags) * (1 + domain_weight * func.coalesce(domain_risk, 0)),
+            updated_at=cls.updated_at
+        )
+        return db.session.execute(statement, execution_options={'synchronize_session': False}).rowcount
+    
+    @classmethod
+    def claim_next(cls, moderator_id, count, lease):
+        """Claim up to `count` of the highest priority pending items for a moderator until now + `lease`.
+        
+        Unclaimed items and items whose claim has expired are eligible. On PostgreSQL the candidates
+        are locked with FOR UPDATE SKIP LOCKED, so concurrent claims never wait on each other or
+        return the same item. Returns the claimed items, highest priority first. Nothing is committed.
+        """
+        now = datetime.utcnow()
+        candidates = select(cls.id) \
+            .where(cls.verification_status == 'pending', or_(cls.claimed_by_id.is_(None), cls.claim_expires_at <= now)) \
+            .order_by(cls.review_priority.desc().nulls_last(), cls.created_at, cls.id) \
+            .limit(count) \
+            .with_for_update(skip_locked=True)
+        
+        statement = update(cls) \
+            .where(cls.id.in_(candidates)) \
+            .values(claimed_by_id=moderator_id, claim_expires_at=now + lease, updated_at=cls.updated_at) \
+            .returning(cls)
+        claimed = db.session.execute(statement, execution_options={'populate_existing': True}).scalars().all()
+        
+        return sorted(claimed, key=lambda item: (-(item.review_priority or 0), item.created_at, item.id))
+    
+    @classmethod
+    def release_claims(cls, ids=None, moderator_id=None, expired_before=None):
+        """Clear review claims, optionally limited to some items, one moderator or claims expired before a time.
+        
+        Returns the number of claims released. Nothing is committed.
+        """
+        statement = update(cls).where(cls.claimed_by_id.isnot(None))
+        if ids is not None:
+            statement = statement.where(cls.id.in_(ids))
+        if moderator_id is not None:
+            statement = statement.where(cls.claimed_by_id == moderator_id)
+        if expired_before is not None:
+            statement = statement.where(cls.claim_expires_at <= expired_before)
+        
+        statement = statement.values(claimed_by_id=None, claim_expires_at=None, updated_at=cls.updated_at)
+        return db.session.execute(statement, execution_options={'synchronize_session': False}).rowcount
+    
+    def claim_is_held_by_other(self, moderator_id):
+        return self.claimed_by_id is not None \
+            and str(self.claimed_by_id) != str(moderator_id) \
+            and self.claim_expires_at is not None \
+            and self.claim_expires_at > datetime.utcnow()
+    
     def __repr__(self):
         return f'<FlaggedContent {self.id}: {self.url}>'
     
@@ -24,6 +222,7 @@ class FlaggedContent(db.Model):
         return {
             'id': self.id,
             'url': self.url,
+            'domain': self.domain,
             'title': self.title,
             'content_type': self.content_type,
             'platform': self.platform,
@@ -37,6 +236,13 @@ class FlaggedContent(db.Model):
 
 
 class Flag(db.Model):
+    __table_args__ = (
+        # Supports time-ordered scans of flags (exports)
+        db.Index('ix_flag_created_at_id', 'created_at', 'id'),
+        # Supports counting a content item's recent flags (review priority)
+        db.Index('ix_flag_flagged_content_id_created_at', 'flagged_content_id', 'created_at'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     reason = db.Column(db.String(100), nullable=False)  # fake_news, misleading, outdated, etc.
     details = db.Column(db.Text, nullable=True)
@@ -59,3 +265,23 @@ class Flag(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+
+# Full-text search support (PostgreSQL only). search_vector is a generated, weighted tsvector over
+# title and description with a GIN index; the trigram index lets URL substring searches use an index.
+# These run when the table is created (src/migrate_db.py runs them on existing databases); other
+# databases fall back to ILIKE searches.
+SEARCH_EXTENSION_DDL = DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+SEARCH_DDL = [
+    DDL(
+        "ALTER TABLE %(table)s ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('english'::regconfig, coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'B')"
+        ") STORED"
+    ),
+    DDL('CREATE INDEX IF NOT EXISTS ix_flagged_content_search_vector ON %(table)s USING GIN (search_vector)'),
+    DDL('CREATE INDEX IF NOT EXISTS ix_flagged_content_url_trgm ON %(table)s USING GIN (url gin_trgm_ops)')
+]
+
+event.listen(FlaggedContent.__table__, 'before_create', SEARCH_EXTENSION_DDL.execute_if(dialect='postgresql'))
+for ddl in SEARCH_DDL:
+    event.listen(FlaggedContent.__table__, 'after_create', ddl.execute_if(dialect='postgresql'))
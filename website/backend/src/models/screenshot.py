@@ -0,0 +1,82 @@
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+
+class Screenshot(db.Model):
+    """Content-addressed screenshot file, shared by every flagged content item that uploaded the same bytes."""
+    id = db.Column(db.Integer, primary_key=True)
+    content_hash = db.Column(db.String(64), unique=True, index=True, nullable=False)  # SHA-256 of the file
+    path = db.Column(db.String(255), unique=True, nullable=False)  # Relative to the static folder
+    size = db.Column(db.Integer, nullable=False)
+    mime_type = db.Column(db.String(50), nullable=False)
+    normalized_path = db.Column(db.String(255), nullable=True)  # EXIF-oriented copy, written by the worker pool
+    ref_count = db.Column(db.Integer, default=0, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<Screenshot {self.content_hash}: {self.ref_count} refs>'
+    
+    @classmethod
+    def acquire(cls, content_hash, path, size, mime_type):
+        """Add a reference to a stored file, creating its row on first use. Nothing is committed.
+        
+        Returns True if the row was created, in which case the caller must (re)write the file:
+        it may have been removed together with a previous row for the same bytes.
+        """
+        updated = cls.query.filter_by(content_hash=content_hash) \
+            .update({cls.ref_count: cls.ref_count + 1}, synchronize_session=False)
+        if updated:
+            return False
+        
+        # First upload of these bytes; another request may be creating the row concurrently
+        try:
+            with db.session.begin_nested():
+                db.session.add(cls(content_hash=content_hash, path=path, size=size, mime_type=mime_type, ref_count=1))
+            return True
+        except IntegrityError:
+            pass
+        cls.query.filter_by(content_hash=content_hash) \
+            .update({cls.ref_count: cls.ref_count + 1}, synchronize_session=False)
+        return False
+    
+    @classmethod
+    def record_normalized(cls, path, normalized_path):
+        """Record the normalized copy of a stored file. Nothing is committed."""
+        cls.query.filter_by(path=path).update({cls.normalized_path: normalized_path}, synchronize_session=False)
+    
+    @classmethod
+    def release(cls, path):
+        """Drop a reference to a stored file. Returns True if it was the last one.
+        
+        The row is kept with a zero count; once the caller's transaction commits, delete it with
+        delete_unreferenced(), which decides whether the file can really be removed. Nothing is committed.
+        """
+        updated = cls.query.filter_by(path=path).update({cls.ref_count: cls.ref_count - 1}, synchronize_session=False)
+        if not updated:
+            # Uploaded before content-addressed storage, so the file was never shared
+            return True
+        
+        return cls.query.filter(cls.path == path, cls.ref_count <= 0).count() > 0
+    
+    @classmethod
+    def delete_unreferenced(cls, path):
+        """Delete the row of a file nobody references anymore. Returns True if it was deleted.
+        
+        The delete locks the row until the caller commits, so remove the file before committing:
+        an upload of the same bytes either referenced the row first (and nothing is deleted here),
+        or waits for the commit and then creates a new row and writes the file again.
+        """
+        deleted = cls.query.filter(cls.path == path, cls.ref_count <= 0).delete(synchronize_session=False)
+        return deleted > 0
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'content_hash': self.content_hash,
+            'path': self.path,
+            'size': self.size,
+            'mime_type': self.mime_type,
+            'normalized_path': self.normalized_path,
+            'ref_count': self.ref_count,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
@@ -1,5 +1,11 @@
-from datetime import datetime
-from src.models.user import db
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+import random
+from sqlalchemy import Date, cast, func, select
+from sqlalchemy.exc import IntegrityError
+from src.models.flagged_content import FlaggedContent, Flag, UPSERT_INSERTS
+from src.models.user import db, User
+from src.models.verification import Verification
 
 class Statistics(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -14,6 +20,60 @@ class Statistics(db.Model):
     def __repr__(self):
         return f'<Statistics {self.date}: {self.total_flags} flags>'
     
+    @classmethod
+    def from_history(cls, days, snapshot_time):
+        """Reconstruct the totals for each of `days` as they stood at `snapshot_time` on that day.
+        
+        Rows are counted by the day of the first snapshot after their creation time and summed
+        into running totals, so the whole range takes four grouped queries. Each flagged content
+        item takes the status of its latest verification before the snapshot (pending if there
+        is none). Deleted rows and status edits made without a verification can't be recovered,
+        so backfilled days are an approximation. Returns unsaved rows, in date order.
+        """
+        days = sorted(days)
+        if not days:
+            return []
+        offset = timedelta(hours=snapshot_time.hour, minutes=snapshot_time.minute, seconds=snapshot_time.second)
+        cutoff = datetime.combine(days[-1], snapshot_time)
+        
+        # Day before the first snapshot a row is counted in -> counter deltas
+        deltas = defaultdict(Counter)
+        for column, model in [('total_flags', Flag), ('total_users', User), ('total_pending', FlaggedContent)]:
+            day = _snapshot_day(model.created_at, offset)
+            for value, count in db.session.execute(
+                select(day, func.count()).where(model.created_at < cutoff).group_by(day)
+            ):
+                deltas[_as_date(value)][column] += count
+        
+        # Each verification moves its content from the previous verification's status (or pending)
+        previous_status = func.lag(Verification.status).over(
+            partition_by=Verification.flagged_content_id,
+            order_by=(Verification.created_at, Verification.id)
+        )
+        changes = select(Verification.created_at, Verification.status, previous_status.label('previous_status')) \
+            .join(FlaggedContent, Verification.flagged_content_id == FlaggedContent.id) \
+            .where(Verification.created_at < cutoff) \
+            .subquery()
+        day = _snapshot_day(changes.c.created_at, offset)
+        previous = func.coalesce(changes.c.previous_status, 'pending')
+        for value, status, previous_value, count in db.session.execute(
+            select(day, changes.c.status, previous, func.count()).group_by(day, changes.c.status, previous)
+        ):
+            if status in COUNTER_STATUS_COLUMNS:
+                deltas[_as_date(value)][COUNTER_STATUS_COLUMNS[status]] += count
+            if previous_value in COUNTER_STATUS_COLUMNS:
+                deltas[_as_date(value)][COUNTER_STATUS_COLUMNS[previous_value]] -= count
+        
+        # Running totals: a row counted from the day after `value` on is in every later snapshot
+        rows = []
+        totals = Counter()
+        pending = sorted(deltas.items())
+        for date in days:
+            while pending and pending[0][0] < date:
+                totals.update(pending.pop(0)[1])
+            rows.append(cls(date=date, **{column: totals[column] for column in COUNTER_COLUMNS}))
+        return rows
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -26,3 +86,196 @@ class Statistics(db.Model):
             'total_pending': self.total_pending
         }
 
+
+def _snapshot_day(column, offset):
+    """SQL expression for the date of `column` shifted back by `offset`, i.e. the day before the first snapshot after it."""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return cast(column - offset, Date)
+    return func.date(column, f'-{int(offset.total_seconds())} seconds')
+
+def _as_date(value):
+    # SQLite returns dates as strings
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+# Counter rows the running totals are spread over, so concurrent writers rarely wait on the same row lock
+STATISTICS_COUNTER_SHARDS = 8
+
+# Verification status -> counter column
+COUNTER_STATUS_COLUMNS = {
+    'pending': 'total_pending',
+    'verified_fake': 'total_verified_fake',
+    'verified_misleading': 'total_verified_misleading',
+    'verified_true': 'total_verified_true'
+}
+
+COUNTER_COLUMNS = ['total_flags', 'total_users'] + list(COUNTER_STATUS_COLUMNS.values())
+
+class StatisticsCounter(db.Model):
+    """Running totals behind Statistics, maintained in the same transaction as the rows they count.
+    
+    The totals are spread over STATISTICS_COUNTER_SHARDS rows, so reading them sums a fixed
+    number of rows however large the counted tables get.
+    """
+    shard = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    total_flags = db.Column(db.Integer, default=0, nullable=False)
+    total_users = db.Column(db.Integer, default=0, nullable=False)
+    total_verified_fake = db.Column(db.Integer, default=0, nullable=False)
+    total_verified_misleading = db.Column(db.Integer, default=0, nullable=False)
+    total_verified_true = db.Column(db.Integer, default=0, nullable=False)
+    total_pending = db.Column(db.Integer, default=0, nullable=False)
+    reconciled_at = db.Column(db.DateTime, nullable=True)  # Set on shard 0 by reconcile()
+    
+    def __repr__(self):
+        return f'<StatisticsCounter {self.shard}: {self.total_flags} flags>'
+    
+    @classmethod
+    def _ensure_shard(cls, shard):
+        try:
+            with db.session.begin_nested():
+                db.session.add(cls(shard=shard))
+        except IntegrityError:
+            pass
+    
+    @classmethod
+    def record(cls, flags=0, users=0, status_changes=None):
+        """Apply counter deltas to a random shard.
+        
+        status_changes maps verification statuses to deltas, e.g. {'pending': -1, 'verified_fake': 1}.
+        Nothing is committed; the caller's transaction covers the update.
+        """
+        values = {}
+        if flags:
+            values[cls.total_flags] = cls.total_flags + flags
+        if users:
+            values[cls.total_users] = cls.total_users + users
+        for status, delta in (status_changes or {}).items():
+            column = COUNTER_STATUS_COLUMNS.get(status)
+            if column and delta:
+                attribute = getattr(cls, column)
+                values[attribute] = values.get(attribute, attribute) + delta
+        
+        if not values:
+            return
+        
+        shard = random.randrange(STATISTICS_COUNTER_SHARDS)
+        updated = cls.query.filter_by(shard=shard).update(values, synchronize_session=False)
+        if updated:
+            return
+        
+        cls._ensure_shard(shard)
+        cls.query.filter_by(shard=shard).update(values, synchronize_session=False)
+    
+    @classmethod
+    def totals(cls):
+        """Sum the shards. Returns None if the counters have never been reconciled."""
+        row = db.session.query(
+            *[func.coalesce(func.sum(getattr(cls, column)), 0) for column in COUNTER_COLUMNS],
+            func.max(cls.reconciled_at)
+        ).one()
+        
+        if row[-1] is None:
+            return None
+        
+        totals = dict(zip(COUNTER_COLUMNS, row))
+        totals['reconciled_at'] = row[-1]
+        return totals
+    
+    @classmethod
+    def reconcile(cls):
+        """Recount the totals with a single aggregate query and reset the shards to them. Commits."""
+        for shard in range(STATISTICS_COUNTER_SHARDS):
+            if db.session.get(cls, shard) is None:
+                cls._ensure_shard(shard)
+        
+        # Lock every shard first: transactions that already counted their changes commit
+        # before the recount sees the table, later ones wait and apply on top of the reset
+        cls.query.order_by(cls.shard).with_for_update().all()
+        
+        status_column = FlaggedContent.verification_status
+        statement = select(
+            select(func.count()).select_from(Flag).scalar_subquery(),
+            select(func.count()).select_from(User).scalar_subquery(),
+            *[func.count().filter(status_column == status) for status in COUNTER_STATUS_COLUMNS]
+        ).select_from(FlaggedContent)
+        row = db.session.execute(statement).one()
+        
+        counts = dict(zip(COUNTER_COLUMNS, row))
+        reconciled_at = datetime.utcnow()
+        
+        cls.query.update({getattr(cls, column): 0 for column in COUNTER_COLUMNS}, synchronize_session=False)
+        cls.query.filter_by(shard=0).update(
+            {**{getattr(cls, column): value for column, value in counts.items()}, cls.reconciled_at: reconciled_at},
+            synchronize_session=False
+        )
+        ContentBreakdown.recount()
+        db.session.commit()
+        
+        return {**counts, 'reconciled_at': reconciled_at}
+
+# Content columns broken down by ContentBreakdown
+BREAKDOWN_DIMENSIONS = ['content_type', 'platform']
+
+class ContentBreakdown(db.Model):
+    """Number of flagged content items per content type and per platform, maintained in the same
+    transaction as the content, so the statistics summary reads a few rows instead of grouping
+    the whole table. Recounted together with StatisticsCounter.
+    """
+    __table_args__ = (
+        db.UniqueConstraint('dimension', 'value', name='uq_content_breakdown_key'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    dimension = db.Column(db.String(20), nullable=False)  # content_type or platform
+    value = db.Column(db.String(100), nullable=False)  # Empty when the platform is unknown
+    content_count = db.Column(db.Integer, default=0, nullable=False)
+    
+    def __repr__(self):
+        return f'<ContentBreakdown {self.dimension}={self.value}: {self.content_count}>'
+    
+    @classmethod
+    def record(cls, changes):
+        """Apply content count deltas, given as (content_type, platform, delta) tuples.
+        
+        Uses INSERT ... ON CONFLICT DO UPDATE, in a fixed key order so concurrent transactions lock
+        rows in the same order. Nothing is committed; the caller's transaction covers the update.
+        """
+        counts = Counter()
+        for content_type, platform, delta in changes:
+            counts[('content_type', content_type or '')] += delta
+            counts[('platform', platform or '')] += delta
+        
+        values = [
+            {'dimension': dimension, 'value': value, 'content_count': delta}
+            for (dimension, value), delta in sorted(counts.items()) if delta
+        ]
+        if not values:
+            return
+        
+        dialect = db.session.get_bind().dialect.name
+        insert = UPSERT_INSERTS.get(dialect)
+        if insert is None:
+            raise NotImplementedError(f'Atomic upsert is not supported on {dialect}')
+        
+        statement = insert(cls).values(values)
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=[cls.dimension, cls.value],
+            set_={'content_count': cls.content_count + statement.excluded.content_count}
+        ))
+    
+    @classmethod
+    def distribution(cls):
+        """Return {dimension: {value: content count}}, leaving out unknown values and empty rows."""
+        distribution = {dimension: {} for dimension in BREAKDOWN_DIMENSIONS}
+        for row in cls.query.filter(cls.content_count > 0, cls.value != '').order_by(cls.dimension, cls.value):
+            distribution[row.dimension][row.value] = row.content_count
+        return distribution
+    
+    @classmethod
+    def recount(cls):
+        """Reset the counts from the flagged content table. Nothing is committed."""
+        cls.query.delete(synchronize_session=False)
+        for dimension in BREAKDOWN_DIMENSIONS:
+            value = func.coalesce(getattr(FlaggedContent, dimension), '')
+            rows = db.session.query(value, func.count()).group_by(value).all()
+            db.session.add_all(cls(dimension=dimension, value=value, content_count=count) for value, count in rows)
@@ -2,6 +2,14 @@ from datetime import datetime
 from src.models.user import db
 
 class Verification(db.Model):
+    __table_args__ = (
+        # Support newest-first keyset pagination, overall and per flagged content
+        db.Index('ix_verification_created_at_id', 'created_at', 'id'),
+        db.Index('ix_verification_flagged_content_id_created_at_id', 'flagged_content_id', 'created_at', 'id'),
+        # Supports incremental exports by last update
+        db.Index('ix_verification_updated_at_id', 'updated_at', 'id'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     status = db.Column(db.String(50), nullable=False)  # pending, verified_fake, verified_misleading, verified_true
     notes = db.Column(db.Text, nullable=True)
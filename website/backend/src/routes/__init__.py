@@ -3,6 +3,9 @@ from src.routes.auth import auth_bp
 from src.routes.flagged_content import flagged_content_bp
 from src.routes.verification import verification_bp
 from src.routes.statistics import statistics_bp
+from src.routes.extension import extension_bp
+from src.routes.domain import domain_bp
+from src.routes.export import export_bp
 from src.routes.google_auth import google_auth_bp
 
 __all__ = [
@@ -11,6 +14,9 @@ __all__ = [
     'flagged_content_bp',
     'verification_bp',
     'statistics_bp',
+    'extension_bp',
+    'domain_bp',
+    'export_bp',
     'google_auth_bp'
 ]
 
@@ -1,10 +1,149 @@
+from collections import namedtuple
 from datetime import datetime, timedelta
-from flask import Blueprint, jsonify, request
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from src.models import db, User, ApiKey
+import os
+from flask import Blueprint, jsonify, request, g
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt, verify_jwt_in_request
+from sqlalchemy import event
+from src.models import db, User, ApiKey, StatisticsCounter
+from src.utils.cache import TTLCache
+from src.utils.rate_limit import MemoryRateLimitBackend, RedisRateLimitBackend, RateLimiter
+from src.utils.write_buffer import WriteBehindBuffer
 
 auth_bp = Blueprint('auth', __name__)
 
+# What authenticated requests need to know about their API key
+ApiKeyIdentity = namedtuple('ApiKeyIdentity', ['id', 'user_id', 'name', 'rate_limit_per_minute', 'rate_limit_burst'])
+
+# Recently validated API keys (and rejected ones, cached as False), so partner requests
+# don't query the database. Deleting or deactivating a key evicts it in this process;
+# other processes pick the change up within API_KEY_CACHE_TTL seconds.
+api_key_cache = TTLCache(
+    maxsize=int(os.getenv('API_KEY_CACHE_SIZE', '10000')),
+    ttl=int(os.getenv('API_KEY_CACHE_TTL', '30'))
+)
+
+# Helper function to write buffered last_used_at times
+def flush_api_key_usage(last_used):
+    try:
+        ApiKey.record_last_used(last_used)
+    except Exception:
+        db.session.rollback()
+        raise
+
+# last_used_at is buffered per key and written with one UPDATE every API_KEY_USAGE_FLUSH_INTERVAL
+# seconds, so using a key doesn't turn a request into a write transaction
+api_key_usage = WriteBehindBuffer(
+    flush_api_key_usage,
+    interval=float(os.getenv('API_KEY_USAGE_FLUSH_INTERVAL', '30')),
+    name='api-key-usage-flusher'
+)
+
+# Start flushing buffered API key usage for this process (called once at startup)
+def start_api_key_usage_flusher(app):
+    api_key_usage.start(app)
+
+# Helper function to drop a key from the cache after it changes
+def invalidate_api_key_cache(key):
+    api_key_cache.delete(key)
+
+@event.listens_for(ApiKey, 'after_update')
+@event.listens_for(ApiKey, 'after_delete')
+def _evict_changed_api_key(mapper, connection, target):
+    invalidate_api_key_cache(target.key)
+
+# Helper function to look up an active API key by its value.
+# Returns an ApiKeyIdentity or None, and records the key as used.
+def authenticate_api_key(key):
+    identity = api_key_cache.get(key)
+    if identity is None:
+        api_key = ApiKey.query.filter_by(key=key, is_active=True).first()
+        identity = False
+        if api_key:
+            identity = ApiKeyIdentity(
+                api_key.id,
+                api_key.user_id,
+                api_key.name,
+                api_key.rate_limit_per_minute,
+                api_key.rate_limit_burst
+            )
+        api_key_cache.set(key, identity)
+    
+    if not identity:
+        return None
+    
+    api_key_usage.record(identity.id, datetime.utcnow())
+    return identity
+
+# Token-bucket rate limits, applied per API key, else per signed-in user, else per client IP.
+# Each is a sustained requests-per-minute rate plus a burst allowance. API keys can override
+# the default with their own quota. Buckets live in this process unless RATE_LIMIT_REDIS_URL
+# points every process at a shared Redis.
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+RATE_LIMIT_DEFAULTS = {
+    'key': (int(os.getenv('RATE_LIMIT_API_KEY_PER_MINUTE', '600')), int(os.getenv('RATE_LIMIT_API_KEY_BURST', '100'))),
+    'user': (int(os.getenv('RATE_LIMIT_USER_PER_MINUTE', '300')), int(os.getenv('RATE_LIMIT_USER_BURST', '60'))),
+    'ip': (int(os.getenv('RATE_LIMIT_IP_PER_MINUTE', '60')), int(os.getenv('RATE_LIMIT_IP_BURST', '20')))
+}
+RATE_LIMIT_REDIS_URL = os.getenv('RATE_LIMIT_REDIS_URL')
+rate_limiter = RateLimiter(
+    RedisRateLimitBackend.from_url(RATE_LIMIT_REDIS_URL) if RATE_LIMIT_REDIS_URL else MemoryRateLimitBackend()
+)
+
+# Helper function to work out who a request is rate limited as.
+# Returns (bucket key, requests per minute, burst).
+def rate_limit_identity():
+    auth_header = request.headers.get('Authorization', '')
+    
+    if auth_header.startswith('ApiKey '):
+        api_key = authenticate_api_key(auth_header.split(' ')[1])
+        if api_key:
+            per_minute, burst = RATE_LIMIT_DEFAULTS['key']
+            return (
+                f'key:{api_key.id}',
+                api_key.rate_limit_per_minute or per_minute,
+                api_key.rate_limit_burst or burst
+            )
+    
+    elif auth_header.startswith('Bearer '):
+        try:
+            verify_jwt_in_request(optional=True)
+            user_id = get_jwt_identity()
+        except Exception:
+            # Invalid or expired tokens are rejected by the endpoint itself
+            user_id = None
+        if user_id is not None:
+            return (f'user:{user_id}',) + RATE_LIMIT_DEFAULTS['user']
+    
+    return (f'ip:{request.remote_addr}',) + RATE_LIMIT_DEFAULTS['ip']
+
+# Registered as a before_request hook on rate limited blueprints
+def check_rate_limit():
+    if not RATE_LIMIT_ENABLED or request.method == 'OPTIONS':
+        return None
+    
+    key, per_minute, burst = rate_limit_identity()
+    result = rate_limiter.hit(key, per_minute, burst)
+    if result is None:
+        return None
+    
+    g.rate_limit = result
+    if not result.allowed:
+        return jsonify({'error': 'Rate limit exceeded, try again later'}), 429, {'Retry-After': str(result.retry_after)}
+    return None
+
+# Registered as an after_request hook on rate limited blueprints
+def add_rate_limit_headers(response):
+    result = g.get('rate_limit')
+    if result is not None:
+        response.headers['RateLimit-Limit'] = str(result.limit)
+        response.headers['RateLimit-Remaining'] = str(result.remaining)
+        response.headers['RateLimit-Reset'] = str(result.reset_after)
+        response.headers['RateLimit-Policy'] = f'{result.limit};w=60;burst={result.burst}'
+    return response
+
+auth_bp.before_request(check_rate_limit)
+auth_bp.after_request(add_rate_limit_headers)
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     data = request.json
@@ -25,6 +164,7 @@ def register():
     user.set_password(data['password'])
     
     db.session.add(user)
+    StatisticsCounter.record(users=1)
     db.session.commit()
     
     return jsonify({'message': 'User registered successfully', 'user': user.to_dict()}), 201
@@ -123,8 +263,53 @@ def delete_api_key(api_key_id):
     db.session.delete(api_key)
     db.session.commit()
     
+    # Evict again now that the delete is visible, in case a concurrent request re-cached the key
+    invalidate_api_key_cache(api_key.key)
+    
     return '', 204
 
+@auth_bp.route('/api-keys/<int:api_key_id>', methods=['PUT'])
+@jwt_required()
+def update_api_key(api_key_id):
+    user_id = get_jwt_identity()
+    user = User.query.get_or_404(user_id)
+    
+    api_key = ApiKey.query.get_or_404(api_key_id)
+    
+    # Check if the API key belongs to the user (admins can manage any key)
+    is_admin = get_jwt().get('role') == 'admin'
+    if api_key.user_id != user.id and not is_admin:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    data = request.json
+    
+    # Update fields
+    if 'name' in data:
+        api_key.name = data['name']
+    
+    if 'is_active' in data:
+        api_key.is_active = bool(data['is_active'])
+    
+    # Quotas are set by admins only; null restores the default limits
+    for field in ['rate_limit_per_minute', 'rate_limit_burst']:
+        if field not in data:
+            continue
+        if not is_admin:
+            return jsonify({'error': 'Only admins can change rate limits'}), 403
+        if data[field] is not None and (not isinstance(data[field], int) or data[field] < 1):
+            return jsonify({'error': f'{field} must be a positive integer or null'}), 400
+        setattr(api_key, field, data[field])
+    
+    db.session.commit()
+    
+    # Evict again now that the change is visible, in case a concurrent request re-cached the key
+    invalidate_api_key_cache(api_key.key)
+    
+    return jsonify({
+        'message': 'API key updated successfully',
+        'api_key': api_key.to_dict()
+    }), 200
+
 @auth_bp.route('/validate-api-key', methods=['POST'])
 def validate_api_key():
     data = request.json
@@ -133,16 +318,12 @@ def validate_api_key():
     if 'api_key' not in data:
         return jsonify({'error': 'Missing required fields'}), 400
     
-    # Find API key
-    api_key = ApiKey.query.filter_by(key=data['api_key'], is_active=True).first()
+    # Find API key (cached; last used time is written in the background)
+    api_key = authenticate_api_key(data['api_key'])
     
     # Check if API key exists
     if not api_key:
         return jsonify({'error': 'Invalid API key'}), 401
     
-    # Update last used time
-    api_key.last_used_at = datetime.utcnow()
-    db.session.commit()
-    
     return jsonify({'valid': True}), 200
 
@@ -0,0 +1,36 @@
+from flask import Blueprint, jsonify, request
+from src.models import DomainStats
+from src.utils.urls import registrable_domain
+
+domain_bp = Blueprint('domain', __name__)
+
+# Columns that can be used to rank domains
+TOP_DOMAIN_ORDERS = {
+    'flag_count': DomainStats.flag_count,
+    'verified_fake_count': DomainStats.verified_fake_count
+}
+
+@domain_bp.route('/domains/top', methods=['GET'])
+def get_top_domains():
+    # Get query parameters
+    limit = min(request.args.get('limit', 10, type=int), 100)  # Limit to 100 domains
+    order_by = request.args.get('order_by', 'flag_count')
+    
+    if order_by not in TOP_DOMAIN_ORDERS:
+        return jsonify({'error': f"order_by must be one of: {', '.join(TOP_DOMAIN_ORDERS)}"}), 400
+    
+    # Served by the index on the ranking column
+    domains = DomainStats.query.order_by(TOP_DOMAIN_ORDERS[order_by].desc()).limit(limit).all()
+    
+    return jsonify([domain.to_dict() for domain in domains]), 200
+
+@domain_bp.route('/domains/<path:domain>', methods=['GET'])
+def get_domain(domain):
+    # Accept any host name and reduce it to its registrable domain
+    domain = registrable_domain(f'http://{domain.strip().lower()}')
+    if not domain:
+        return jsonify({'error': 'Invalid domain'}), 400
+    
+    domain_stats = DomainStats.query.filter_by(domain=domain).first_or_404()
+    
+    return jsonify(domain_stats.to_dict()), 200
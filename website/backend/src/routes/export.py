@@ -0,0 +1,164 @@
+import csv
+import io
+import json
+import os
+import zlib
+from datetime import datetime, timedelta, timezone
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt
+from sqlalchemy import select
+from src.models import db, FlaggedContent, Flag, Verification
+from src.routes.flagged_content import apply_search
+from src.utils.responses import accepts_gzip
+
+export_bp = Blueprint('export', __name__)
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_FETCH_SIZE = 1000
+
+# Approximate number of bytes buffered before a chunk is sent to the client
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+# Timestamps are set before their transaction commits, so an export only covers rows older
+# than EXPORT_COMMIT_LAG seconds; newer ones may still be invisible and are left to the next pull
+EXPORT_COMMIT_LAG = timedelta(seconds=float(os.getenv('EXPORT_COMMIT_LAG', '30')))
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+# Exported columns per dataset, and the timestamp column the `since` watermark applies to
+EXPORT_DATASETS = {
+    'flagged-content': {
+        'model': FlaggedContent,
+        'columns': ['id', 'url', 'domain', 'title', 'content_type', 'platform', 'description',
+                    'screenshot_path', 'verification_status', 'flag_count', 'created_at', 'updated_at'],
+        'watermark': 'updated_at'
+    },
+    'flags': {
+        'model': Flag,
+        'columns': ['id', 'reason', 'details', 'flagged_content_id', 'user_id', 'created_at'],
+        'watermark': 'created_at'
+    },
+    'verifications': {
+        'model': Verification,
+        'columns': ['id', 'status', 'notes', 'evidence_links', 'flagged_content_id', 'moderator_id',
+                    'created_at', 'updated_at'],
+        'watermark': 'updated_at'
+    }
+}
+
+def serialize_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def build_export_query(dataset, since, until):
+    model = dataset['model']
+    watermark_column = getattr(model, dataset['watermark'])
+    
+    statement = select(*[getattr(model, column) for column in dataset['columns']])
+    
+    # Filters mirroring the listing endpoints
+    if model is FlaggedContent:
+        if request.args.get('content_type'):
+            statement = statement.filter(FlaggedContent.content_type == request.args['content_type'])
+        if request.args.get('verification_status'):
+            statement = statement.filter(FlaggedContent.verification_status == request.args['verification_status'])
+        if request.args.get('q'):
+            statement, _ = apply_search(statement, request.args['q'])
+    elif model is Flag:
+        if request.args.get('reason'):
+            statement = statement.filter(Flag.reason == request.args['reason'])
+    elif model is Verification:
+        if request.args.get('status'):
+            statement = statement.filter(Verification.status == request.args['status'])
+    
+    flagged_content_id = request.args.get('flagged_content_id', type=int)
+    if flagged_content_id and model is not FlaggedContent:
+        statement = statement.filter(model.flagged_content_id == flagged_content_id)
+    
+    if since:
+        statement = statement.filter(watermark_column >= since)
+    statement = statement.filter(watermark_column < until)
+    
+    # Oldest first, so an interrupted export can be resumed from the last row received
+    return statement.order_by(watermark_column, model.id).execution_options(yield_per=EXPORT_FETCH_SIZE)
+
+def generate_rows(statement, columns, export_format):
+    buffer = io.StringIO()
+    if export_format == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+    
+    # Rows are streamed from a server-side cursor and flushed in chunks, so memory use stays flat
+    for row in db.session.execute(statement):
+        values = [serialize_value(value) for value in row]
+        if export_format == 'csv':
+            writer.writerow(values)
+        else:
+            buffer.write(json.dumps(dict(zip(columns, values)), separators=(',', ':')))
+            buffer.write('\n')
+        
+        if buffer.tell() >= EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+@export_bp.route('/export/<dataset_name>', methods=['GET'])
+@jwt_required()
+def export_dataset(dataset_name):
+    # Check user role
+    claims = get_jwt()
+    if claims.get('role') not in ['moderator', 'admin']:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    dataset = EXPORT_DATASETS.get(dataset_name)
+    if not dataset:
+        return jsonify({'error': f"Dataset must be one of: {', '.join(EXPORT_DATASETS)}"}), 404
+    
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    
+    since = None
+    if request.args.get('since'):
+        try:
+            since = datetime.fromisoformat(request.args['since'].replace('Z', '+00:00'))
+        except ValueError:
+            return jsonify({'error': 'since must be an ISO 8601 timestamp'}), 400
+        # Timestamps are stored as naive UTC, so convert offsets rather than dropping them
+        if since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    
+    # Upper bound of this export; pass it back as `since` to fetch the next increment
+    watermark = datetime.utcnow() - EXPORT_COMMIT_LAG
+    
+    statement = build_export_query(dataset, since, watermark)
+    chunks = generate_rows(statement, dataset['columns'], export_format)
+    
+    extension = 'csv' if export_format == 'csv' else 'ndjson'
+    headers = {
+        'X-Export-Watermark': watermark.isoformat(),
+        'Content-Disposition': f'attachment; filename="{dataset_name}.{extension}"',
+        'Vary': 'Accept-Encoding'
+    }
+    
+    use_gzip = request.args.get('gzip') == '1' or accepts_gzip()
+    if use_gzip:
+        chunks = gzip_chunks(chunks)
+        headers['Content-Encoding'] = 'gzip'
+    
+    return Response(stream_with_context(chunks), mimetype=EXPORT_FORMATS[export_format], headers=headers)
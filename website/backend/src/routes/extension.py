@@ -0,0 +1,133 @@
+import os
+from datetime import datetime, timedelta, timezone
+from flask import Blueprint, jsonify, request
+from sqlalchemy import func, tuple_
+from src.models import db, FlaggedContent, DeletedContent, DomainStats
+from src.routes.auth import check_rate_limit, add_rate_limit_headers
+from src.utils.cursors import encode_cursor, decode_cursor, parse_cursor_datetime
+from src.utils.responses import compact_json_response
+from src.utils.urls import registrable_domain
+
+extension_bp = Blueprint('extension', __name__)
+extension_bp.before_request(check_rate_limit)
+extension_bp.after_request(add_rate_limit_headers)
+
+# Maximum number of changed items returned by a single sync request
+SYNC_PAGE_SIZE = 1000
+
+# updated_at and tombstone ids are assigned before their transaction commits, so a row can
+# become visible after a sync has already moved past it. Syncs only serve changes older than
+# SYNC_COMMIT_LAG seconds, which every transaction is expected to have committed within.
+SYNC_COMMIT_LAG = timedelta(seconds=float(os.getenv('SYNC_COMMIT_LAG', '30')))
+
+# Domains are only pushed to extensions once they host content verified as fake
+MIN_DOMAIN_VERIFIED_FAKE = 1
+
+# Field order used by the compact (array) encoding
+COMPACT_URL_FIELDS = ['url', 'contentId', 'verificationStatus', 'flagCount']
+
+def sync_url_entry(content):
+    return {
+        'url': content.url,
+        'contentId': content.id,
+        'verificationStatus': content.verification_status,
+        'flagCount': content.flag_count
+    }
+
+@extension_bp.route('/extension/sync', methods=['POST'])
+def sync_extension():
+    data = request.get_json(silent=True) or {}
+    compact = bool(data.get('compact'))
+    
+    # Work out where this client left off
+    changed_after = None
+    deleted_after_id = None
+    deleted_after_time = None
+    
+    if data.get('cursor'):
+        try:
+            cursor = decode_cursor(data['cursor'])
+            changed_after = (parse_cursor_datetime(cursor['u'][0]), int(cursor['u'][1]))
+            deleted_after_id = int(cursor['d'])
+        except (KeyError, IndexError, TypeError, ValueError):
+            return jsonify({'error': 'Invalid cursor'}), 400
+    elif data.get('lastSyncTime'):
+        # Older clients only send the time of their last sync
+        try:
+            last_sync_time = datetime.fromisoformat(data['lastSyncTime'].replace('Z', '+00:00'))
+        except (AttributeError, ValueError):
+            return jsonify({'error': 'Invalid lastSyncTime'}), 400
+        # Timestamps are stored as naive UTC, so convert offsets rather than dropping them
+        if last_sync_time.tzinfo is not None:
+            last_sync_time = last_sync_time.astimezone(timezone.utc).replace(tzinfo=None)
+        changed_after = (last_sync_time, 0)
+        deleted_after_time = last_sync_time
+    
+    sync_time = datetime.utcnow() - SYNC_COMMIT_LAG
+    
+    # Changed content, in (updated_at, id) order
+    query = FlaggedContent.query.filter(FlaggedContent.updated_at < sync_time)
+    if changed_after:
+        query = query.filter(tuple_(FlaggedContent.updated_at, FlaggedContent.id) > changed_after)
+    changed = query.order_by(FlaggedContent.updated_at, FlaggedContent.id).limit(SYNC_PAGE_SIZE + 1).all()
+    
+    has_more = len(changed) > SYNC_PAGE_SIZE
+    changed = changed[:SYNC_PAGE_SIZE]
+    
+    # Tombstones for deleted content. A full sync has nothing to delete, so it only records the position.
+    deleted = []
+    settled_tombstones = db.session.query(func.max(DeletedContent.id)).filter(DeletedContent.deleted_at < sync_time)
+    if changed_after is None:
+        deleted_after_id = settled_tombstones.scalar() or 0
+    else:
+        tombstones = DeletedContent.query.filter(DeletedContent.deleted_at < sync_time)
+        if deleted_after_id is not None:
+            tombstones = tombstones.filter(DeletedContent.id > deleted_after_id)
+        else:
+            tombstones = tombstones.filter(DeletedContent.deleted_at > deleted_after_time)
+        deleted = tombstones.order_by(DeletedContent.id).limit(SYNC_PAGE_SIZE + 1).all()
+        
+        has_more = has_more or len(deleted) > SYNC_PAGE_SIZE
+        deleted = deleted[:SYNC_PAGE_SIZE]
+        if deleted:
+            deleted_after_id = deleted[-1].id
+        elif deleted_after_id is None:
+            deleted_after_id = settled_tombstones.scalar() or 0
+    
+    # Aggregates for every domain touched by this page of changes
+    touched_domains = {content.domain for content in changed if content.domain}
+    touched_domains.update(registrable_domain(tombstone.url) for tombstone in deleted)
+    touched_domains.discard(None)
+    
+    flagged_domains = []
+    if touched_domains:
+        domain_rows = DomainStats.query.filter(
+            DomainStats.domain.in_(touched_domains),
+            DomainStats.verified_fake_count >= MIN_DOMAIN_VERIFIED_FAKE
+        ).all()
+        flagged_domains = [
+            {'domain': row.domain, 'flagCount': row.flag_count, 'verifiedFakeCount': row.verified_fake_count}
+            for row in domain_rows
+        ]
+    
+    if changed:
+        changed_after = (changed[-1].updated_at, changed[-1].id)
+    elif changed_after is None:
+        changed_after = (datetime.min, 0)
+    
+    flagged_urls = [sync_url_entry(content) for content in changed]
+    if compact:
+        flagged_urls = [[entry[field] for field in COMPACT_URL_FIELDS] for entry in flagged_urls]
+    
+    payload = {
+        'syncTime': sync_time.isoformat(),
+        'cursor': encode_cursor({'u': [changed_after[0], changed_after[1]], 'd': deleted_after_id}),
+        'hasMore': has_more,
+        'flaggedUrls': flagged_urls,
+        'deletedUrls': [tombstone.url for tombstone in deleted],
+        'flaggedDomains': flagged_domains
+    }
+    if compact:
+        payload['fields'] = COMPACT_URL_FIELDS
+    
+    return compact_json_response(payload)
@@ -1,12 +1,255 @@
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+import json
 import os
-import uuid
+import re
+import threading
+import time
 from flask import Blueprint, jsonify, request, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
-from werkzeug.utils import secure_filename
-from src.models import db, FlaggedContent, Flag, User, ApiKey
+from sqlalchemy import func, insert, literal_column, or_
+from src.models import db, FlaggedContent, Flag, User, DeletedContent, DomainStats, Screenshot, StatisticsCounter, ContentBreakdown, FlagRollup
+from src.routes.auth import authenticate_api_key, check_rate_limit, add_rate_limit_headers
+from src.utils.bloom import CountingBloomFilter
+from src.utils.cache import TTLCache
+from src.utils.ingest_queue import DurableQueue, GroupCommitWorker, QueueFullError
+from src.utils.pagination import COUNT_MODES, clamp_per_page, keyset_page, count_rows
+from src.utils.trending import TrendingTracker, parse_duration
+from src.utils.screenshots import (
+    ScreenshotProcessor, ScreenshotTooLarge, UnsupportedScreenshot,
+    stage_upload, place_upload, discard_upload, is_content_addressed, process_screenshot, remove_screenshot_files
+)
+from src.utils.urls import hash_url
 
 flagged_content_bp = Blueprint('flagged_content', __name__)
+flagged_content_bp.before_request(check_rate_limit)
+flagged_content_bp.after_request(add_rate_limit_headers)
+
+# Maximum number of URLs accepted by a single /check-urls request
+MAX_CHECK_URLS = 500
+
+# Maximum number of flag records accepted by a single bulk ingestion request
+MAX_BULK_FLAGS = 10000
+
+# URLs upserted per INSERT statement during bulk ingestion
+BULK_UPSERT_BATCH_SIZE = 1000
+
+# Maximum length of each bulk record field, taken from the columns it is stored in
+BULK_FIELD_LENGTHS = {
+    'url': FlaggedContent.__table__.c.url.type.length,
+    'title': FlaggedContent.__table__.c.title.type.length,
+    'content_type': FlaggedContent.__table__.c.content_type.type.length,
+    'platform': FlaggedContent.__table__.c.platform.type.length,
+    'reason': Flag.__table__.c.reason.type.length
+}
+
+# Optional write-behind ingestion: flags are acknowledged once appended to a local journal and
+# applied to the database in group-committed batches by a background worker (see start_ingest_worker)
+INGEST_ASYNC = os.getenv('INGEST_ASYNC', 'false').lower() == 'true'
+INGEST_QUEUE_DIR = os.getenv('INGEST_QUEUE_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'ingest_queue'))
+INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', '500'))
+INGEST_FLUSH_INTERVAL = float(os.getenv('INGEST_FLUSH_INTERVAL', '1.0'))
+INGEST_MAX_QUEUE_DEPTH = int(os.getenv('INGEST_MAX_QUEUE_DEPTH', '100000'))
+INGEST_FSYNC = os.getenv('INGEST_FSYNC', 'true').lower() == 'true'
+INGEST_DEAD_LETTER_AFTER = float(os.getenv('INGEST_DEAD_LETTER_AFTER', '60'))
+ingest_queue = None
+ingest_worker = None
+
+# In-process caches for URL checks, keyed by canonical URL hash.
+# Flagged content is cached separately from "not flagged" answers so each can be sized on its own.
+url_cache = TTLCache(
+    maxsize=int(os.getenv('URL_CACHE_SIZE', '10000')),
+    ttl=int(os.getenv('URL_CACHE_TTL', '60'))
+)
+negative_url_cache = TTLCache(
+    maxsize=int(os.getenv('URL_NEGATIVE_CACHE_SIZE', '100000')),
+    ttl=int(os.getenv('URL_NEGATIVE_CACHE_TTL', '30'))
+)
+
+# Helper function to drop cached check-url results after a write
+def invalidate_url_cache(url_hash):
+    url_cache.delete(url_hash)
+    negative_url_cache.delete(url_hash)
+
+# Per-process counting Bloom filter of flagged URL hashes. URLs it has never seen are
+# answered as "not flagged" without touching the database, so it must never miss a row.
+# Rows inserted by other processes are picked up by polling on created_at. created_at is set
+# before the inserting transaction commits, so every poll re-scans the last
+# URL_FILTER_COMMIT_LAG seconds to catch rows that committed after a previous poll passed them.
+# The filter is also rebuilt from scratch every URL_FILTER_REBUILD_INTERVAL seconds in the
+# background, which catches rows from transactions that took longer than the lag.
+URL_FILTER_ENABLED = os.getenv('URL_FILTER_ENABLED', 'true').lower() == 'true'
+URL_FILTER_REFRESH_INTERVAL = float(os.getenv('URL_FILTER_REFRESH_INTERVAL', '5'))
+URL_FILTER_COMMIT_LAG = timedelta(seconds=float(os.getenv('URL_FILTER_COMMIT_LAG', '30')))
+URL_FILTER_REBUILD_INTERVAL = float(os.getenv('URL_FILTER_REBUILD_INTERVAL', '3600'))
+URL_FILTER_CAPACITY = int(os.getenv('URL_FILTER_CAPACITY', '1000000'))
+URL_FILTER_ERROR_RATE = float(os.getenv('URL_FILTER_ERROR_RATE', '0.01'))
+url_filter = CountingBloomFilter(capacity=URL_FILTER_CAPACITY, error_rate=URL_FILTER_ERROR_RATE)
+url_filter_lock = threading.Lock()
+url_filter_state = {
+    'ready': False,
+    'watermark': None,  # Newest created_at added to the filter
+    'recent_ids': {},  # id -> created_at of rows added within the commit lag of the watermark
+    'refreshed_at': 0.0,
+    'rebuilt_at': 0.0,
+    'rebuilding': False,
+    'rebuilds': 0,
+    'checks': 0,
+    'definite_misses': 0
+}
+
+# Helper function to add flagged content rows created since a time (all rows when None) to a filter.
+# Rows whose id is in recent_ids are skipped, since adding a URL twice would keep it in the filter
+# after it is deleted. Returns the new watermark and recent_ids.
+def _add_rows_to_url_filter(target, since, watermark, recent_ids):
+    query = db.session.query(FlaggedContent.id, FlaggedContent.url_hash, FlaggedContent.created_at)
+    if since is not None:
+        query = query.filter(FlaggedContent.created_at >= since)
+    rows = query.order_by(FlaggedContent.created_at, FlaggedContent.id).yield_per(10000)
+    
+    recent_ids = dict(recent_ids)
+    for content_id, url_hash, created_at in rows:
+        if content_id in recent_ids:
+            continue
+        target.add(url_hash)
+        if created_at is not None:
+            recent_ids[content_id] = created_at
+            watermark = created_at if watermark is None else max(watermark, created_at)
+    
+    # Only rows inside the re-scan window need to be remembered
+    if watermark is not None:
+        cutoff = watermark - URL_FILTER_COMMIT_LAG
+        recent_ids = {content_id: created_at for content_id, created_at in recent_ids.items() if created_at >= cutoff}
+    return watermark, recent_ids
+
+# Helper function to build a new URL filter from all flagged content and swap it in
+def _rebuild_url_filter():
+    global url_filter
+    
+    new_filter = CountingBloomFilter(capacity=URL_FILTER_CAPACITY, error_rate=URL_FILTER_ERROR_RATE)
+    watermark, recent_ids = _add_rows_to_url_filter(new_filter, None, None, {})
+    
+    with url_filter_lock:
+        # Catch up on rows committed while the table was being scanned, then swap
+        since = watermark - URL_FILTER_COMMIT_LAG if watermark is not None else None
+        watermark, recent_ids = _add_rows_to_url_filter(new_filter, since, watermark, recent_ids)
+        url_filter = new_filter
+        url_filter_state.update(
+            watermark=watermark,
+            recent_ids=recent_ids,
+            refreshed_at=time.monotonic(),
+            rebuilt_at=time.monotonic(),
+            rebuilds=url_filter_state['rebuilds'] + 1,
+            ready=True
+        )
+
+# Build the URL filter from all flagged content (called once at startup)
+def load_url_filter():
+    if not URL_FILTER_ENABLED:
+        return
+    
+    _rebuild_url_filter()
+
+# Helper function to rebuild the URL filter in a background thread
+def _start_url_filter_rebuild():
+    app = current_app._get_current_object()
+    
+    def run():
+        with app.app_context():
+            try:
+                _rebuild_url_filter()
+            except Exception:
+                db.session.rollback()
+            finally:
+                url_filter_state['rebuilding'] = False
+    
+    url_filter_state['rebuilding'] = True
+    threading.Thread(target=run, name='url-filter-rebuild', daemon=True).start()
+
+# Pick up rows inserted since the last refresh (by this or any other process)
+def refresh_url_filter(force=False):
+    if not url_filter_state['ready']:
+        return
+    
+    now = time.monotonic()
+    if not url_filter_state['rebuilding'] and now - url_filter_state['rebuilt_at'] >= URL_FILTER_REBUILD_INTERVAL:
+        _start_url_filter_rebuild()
+    
+    if not force and now - url_filter_state['refreshed_at'] < URL_FILTER_REFRESH_INTERVAL:
+        return
+    
+    with url_filter_lock:
+        watermark = url_filter_state['watermark']
+        since = watermark - URL_FILTER_COMMIT_LAG if watermark is not None else None
+        url_filter_state['watermark'], url_filter_state['recent_ids'] = _add_rows_to_url_filter(
+            url_filter, since, watermark, url_filter_state['recent_ids']
+        )
+        url_filter_state['refreshed_at'] = time.monotonic()
+
+# Per-process trending detector: flags are counted per URL hash over sliding windows as they
+# are ingested, so GET /trending is answered from memory. Each process only sees the flags it
+# ingested itself (plus those loaded at startup by load_trending).
+TRENDING_WINDOWS = {name: parse_duration(name) for name in os.getenv('TRENDING_WINDOWS', '15m,1h,24h').split(',')}
+TRENDING_DEFAULT_WINDOW = '1h' if '1h' in TRENDING_WINDOWS else next(iter(TRENDING_WINDOWS))
+MAX_TRENDING_LIMIT = 100
+trending_tracker = TrendingTracker(
+    TRENDING_WINDOWS,
+    width=int(os.getenv('TRENDING_SKETCH_WIDTH', '4096')),
+    candidates=int(os.getenv('TRENDING_CANDIDATES', '500'))
+)
+
+# Helper function to convert a naive UTC datetime to a Unix timestamp
+def utc_timestamp(value):
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+# Seed the trending windows with the flags already in the database (called once at startup)
+def load_trending():
+    since = datetime.utcnow() - timedelta(seconds=max(TRENDING_WINDOWS.values()))
+    rows = db.session.query(FlaggedContent.url_hash, Flag.created_at) \
+        .join(Flag, Flag.flagged_content_id == FlaggedContent.id) \
+        .filter(Flag.created_at >= since) \
+        .order_by(Flag.created_at) \
+        .yield_per(10000)
+    
+    for url_hash, created_at in rows:
+        trending_tracker.record(url_hash, utc_timestamp(created_at))
+
+# Helper function to resolve URL hashes to serialized content, going to the database only for cache misses
+def lookup_url_hashes(url_hashes):
+    found = {}
+    missing = set()
+    
+    refresh_url_filter()
+    use_filter = url_filter_state['ready']
+    
+    for url_hash in url_hashes:
+        if url_hash in found or url_hash in missing:
+            continue
+        
+        # Definite misses never reach the caches or the database
+        if use_filter:
+            url_filter_state['checks'] += 1
+            if url_hash not in url_filter:
+                url_filter_state['definite_misses'] += 1
+                continue
+        
+        content = url_cache.get(url_hash)
+        if content is not None:
+            found[url_hash] = content
+        elif negative_url_cache.get(url_hash) is None:
+            missing.add(url_hash)
+    
+    if missing:
+        matches = FlaggedContent.query.filter(FlaggedContent.url_hash.in_(missing)).all()
+        for flagged_content in matches:
+            content = flagged_content.to_dict()
+            url_cache.set(flagged_content.url_hash, content)
+            found[flagged_content.url_hash] = content
+            missing.discard(flagged_content.url_hash)
+        
+        for url_hash in missing:
+            negative_url_cache.set(url_hash, True)
+    
+    return found
 
 # Helper function to check if API key is valid
 def validate_api_key():
@@ -15,43 +258,101 @@ def validate_api_key():
         return None
     
     api_key_value = auth_header.split(' ')[1]
-    api_key = ApiKey.query.filter_by(key=api_key_value, is_active=True).first()
-    
-    if api_key:
-        # Update last used time
-        api_key.last_used_at = datetime.utcnow()
-        db.session.commit()
-        return api_key
     
-    return None
+    # Cached lookup; the last used time is buffered and written in the background
+    return authenticate_api_key(api_key_value)
+
+# Screenshots are stored once per distinct file (named by content hash) and shared through
+# reference counts; thumbnails, normalized copies and unlinking run on a small worker pool
+MAX_SCREENSHOT_BYTES = int(os.getenv('MAX_SCREENSHOT_BYTES', str(10 * 1024 * 1024)))
+screenshot_processor = ScreenshotProcessor(max_workers=int(os.getenv('SCREENSHOT_WORKERS', '2')))
 
 # Helper function to save screenshot
 def save_screenshot(file):
     if not file:
         return None
     
-    # Create screenshots directory if it doesn't exist
-    screenshots_dir = os.path.join(current_app.static_folder, 'screenshots')
-    os.makedirs(screenshots_dir, exist_ok=True)
-    
-    # Generate unique filename
-    filename = str(uuid.uuid4()) + secure_filename(file.filename)
-    file_path = os.path.join(screenshots_dir, filename)
+    # Hash while streaming to disk; identical uploads resolve to the same file
+    content_hash, relative_path, size, mime_type, temp_path = stage_upload(
+        file.stream, current_app.static_folder, MAX_SCREENSHOT_BYTES
+    )
+    try:
+        created = Screenshot.acquire(content_hash, relative_path, size, mime_type)
+    except BaseException:
+        discard_upload(temp_path)
+        raise
     
-    # Save file
-    file.save(file_path)
+    # The file is only placed once the row is referenced, so it can't be unlinked under us.
+    # A new row means any previous file for these bytes may have been removed with its old row.
+    if place_upload(current_app.static_folder, temp_path, relative_path, replace=created):
+        screenshot_processor.submit(process_stored_screenshot, current_app._get_current_object(), relative_path)
     
     # Return relative path
-    return os.path.join('screenshots', filename)
+    return relative_path
+
+# Helper function to write a screenshot's thumbnail and normalized copy (runs on the worker pool)
+def process_stored_screenshot(app, relative_path):
+    with app.app_context():
+        normalized_path = process_screenshot(app.static_folder, relative_path)
+        if normalized_path:
+            Screenshot.record_normalized(relative_path, normalized_path)
+            db.session.commit()
+
+# Helper function to unlink a screenshot once nothing references it (runs on the worker pool)
+def remove_unreferenced_screenshot(app, relative_path):
+    with app.app_context():
+        # The same bytes may have been uploaded again since the last reference was released.
+        # The row stays locked until the files are gone, so a concurrent upload of them waits
+        # and then writes the file again. Legacy uploads have no row and were never shared.
+        if is_content_addressed(relative_path) and not Screenshot.delete_unreferenced(relative_path):
+            db.session.rollback()
+            return
+        
+        remove_screenshot_files(app.static_folder, relative_path)
+        db.session.commit()
+
+# Helper function to apply the `q` search parameter to a flagged content query.
+# Returns the filtered query and a relevance expression to sort by (None when not available).
+def apply_search(query, search_query):
+    if db.engine.dialect.name != 'postgresql':
+        # Databases without full-text search fall back to substring matching
+        return query.filter(
+            (FlaggedContent.url.ilike(f'%{search_query}%')) |
+            (FlaggedContent.title.ilike(f'%{search_query}%')) |
+            (FlaggedContent.description.ilike(f'%{search_query}%'))
+        ), None
+    
+    # URL substrings are served by the trigram index
+    url_match = FlaggedContent.url.ilike(f'%{search_query}%')
+    
+    # Every word must match, the last ones as prefixes so results show up while typing
+    words = re.findall(r'\w+', search_query.lower())
+    if not words:
+        return query.filter(url_match), None
+    
+    search_vector = literal_column('flagged_content.search_vector')
+    ts_query = func.to_tsquery('english', ' & '.join(f'{word}:*' for word in words))
+    
+    query = query.filter(or_(search_vector.op('@@')(ts_query), url_match))
+    return query, func.ts_rank_cd(search_vector, ts_query)
 
 @flagged_content_bp.route('/flagged-content', methods=['GET'])
 def get_flagged_content():
     # Get query parameters
     page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 10, type=int), 100)  # Limit to 100 items per page
+    per_page = clamp_per_page(request.args.get('per_page', 10, type=int), 100)  # Limit to 100 items per page
     content_type = request.args.get('content_type')
     verification_status = request.args.get('verification_status')
     search_query = request.args.get('q')
+    sort = request.args.get('sort', 'relevance')  # relevance or newest; only applies to searches
+    after = request.args.get('after')  # Cursor from the previous page; switches to keyset pagination
+    count_mode = request.args.get('count', 'exact' if after is None else 'none')
+    
+    if count_mode not in COUNT_MODES:
+        return jsonify({'error': f"count must be one of: {', '.join(COUNT_MODES)}"}), 400
+    
+    if sort not in ['relevance', 'newest']:
+        return jsonify({'error': 'sort must be one of: relevance, newest'}), 400
     
     # Build query
     query = FlaggedContent.query
@@ -63,24 +364,39 @@ def get_flagged_content():
     if verification_status:
         query = query.filter(FlaggedContent.verification_status == verification_status)
     
+    rank = None
     if search_query:
-        query = query.filter(
-            (FlaggedContent.url.ilike(f'%{search_query}%')) |
-            (FlaggedContent.title.ilike(f'%{search_query}%')) |
-            (FlaggedContent.description.ilike(f'%{search_query}%'))
-        )
+        query, rank = apply_search(query, search_query)
+    
+    # Cursor mode: seek past the previous page on the (created_at, id) index instead of using OFFSET
+    if after is not None:
+        try:
+            items, next_cursor = keyset_page(query, FlaggedContent.created_at, FlaggedContent.id, after, per_page)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        
+        return jsonify({
+            'items': [item.to_dict() for item in items],
+            'next_cursor': next_cursor,
+            'total': count_rows(query, count_mode),
+            'per_page': per_page
+        }), 200
     
-    # Order by created_at (newest first)
-    query = query.order_by(FlaggedContent.created_at.desc())
+    # Order search results by relevance unless asked otherwise, then by created_at (newest first)
+    if rank is not None and sort == 'relevance':
+        query = query.order_by(rank.desc(), FlaggedContent.created_at.desc(), FlaggedContent.id.desc())
+    else:
+        query = query.order_by(FlaggedContent.created_at.desc(), FlaggedContent.id.desc())
     
     # Paginate results
-    paginated_results = query.paginate(page=page, per_page=per_page, error_out=False)
+    paginated_results = query.paginate(page=page, per_page=per_page, error_out=False, count=count_mode == 'exact')
+    total = paginated_results.total if count_mode == 'exact' else count_rows(query, count_mode)
     
     # Prepare response
     return jsonify({
         'items': [item.to_dict() for item in paginated_results.items],
-        'total': paginated_results.total,
-        'pages': paginated_results.pages,
+        'total': total,
+        'pages': -(-total // per_page) if total is not None else None,
         'page': page,
         'per_page': per_page
     }), 200
@@ -118,58 +434,84 @@ def create_flagged_content():
     if api_key and api_key.user_id:
         user_id = api_key.user_id
     
-    # Check if content already exists
-    existing_content = FlaggedContent.query.filter_by(url=data['url']).first()
-    
-    if existing_content:
-        # Content already exists, add a new flag
-        flag = Flag(
-            reason=data['reason'],
-            details=data.get('details'),
-            flagged_content_id=existing_content.id,
-            user_id=user_id
-        )
+    # In write-behind mode, acknowledge once the flag is in the durable queue.
+    # Submissions with a screenshot are always applied synchronously.
+    if ingest_queue is not None and 'screenshot' not in request.files:
+        error = validate_bulk_record(data)
+        if error:
+            return jsonify({'error': error}), 400
         
-        # Increment flag count
-        existing_content.flag_count += 1
-        
-        db.session.add(flag)
-        db.session.commit()
+        try:
+            ingest_queue.put({
+                'url': data['url'],
+                'content_type': data['content_type'],
+                'title': data.get('title'),
+                'platform': data.get('platform'),
+                'description': data.get('description'),
+                'reason': data['reason'],
+                'details': data.get('details'),
+                'user_id': user_id,
+                'queued_at': datetime.utcnow().isoformat()
+            })
+        except QueueFullError:
+            return jsonify({'error': 'Too many pending submissions, try again later'}), 503, {'Retry-After': '5'}
         
-        return jsonify({
-            'message': 'Content already flagged, added your flag',
-            'flagged_content': existing_content.to_dict(),
-            'flag': flag.to_dict()
-        }), 200
-    
-    # Process screenshot if provided
-    screenshot_path = None
-    if 'screenshot' in request.files:
-        screenshot_path = save_screenshot(request.files['screenshot'])
+        ingest_worker.notify()
+        return jsonify({'message': 'Flag accepted for processing', 'queued': True}), 202
     
-    # Create new flagged content
-    flagged_content = FlaggedContent(
+    # Insert the content or increment its flag count in a single atomic statement
+    # (matched on the canonical URL hash)
+    flagged_content, created = FlaggedContent.upsert(
         url=data['url'],
-        title=data.get('title'),
         content_type=data['content_type'],
+        title=data.get('title'),
         platform=data.get('platform'),
-        description=data.get('description'),
-        screenshot_path=screenshot_path
+        description=data.get('description')
     )
     
-    db.session.add(flagged_content)
-    db.session.flush()  # Get ID without committing
-    
-    # Create flag
+    # Process screenshot if provided (only kept for newly flagged content)
+    if created and 'screenshot' in request.files:
+        try:
+            flagged_content.screenshot_path = save_screenshot(request.files['screenshot'])
+        except ScreenshotTooLarge as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 413
+        except UnsupportedScreenshot as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+    
+    # Create flag (its creation time also picks the rollup bucket, as in a rollup rebuild)
     flag = Flag(
         reason=data['reason'],
         details=data.get('details'),
         flagged_content_id=flagged_content.id,
-        user_id=user_id
+        user_id=user_id,
+        created_at=datetime.utcnow()
     )
     
+    if created:
+        DomainStats.record(flagged_content.domain, content=1, flags=1, status_changes={'pending': 1})
+        StatisticsCounter.record(flags=1, status_changes={'pending': 1})
+        ContentBreakdown.record([(flagged_content.content_type, flagged_content.platform, 1)])
+    else:
+        DomainStats.record(flagged_content.domain, flags=1)
+        StatisticsCounter.record(flags=1)
+    
+    FlagRollup.record([(flag.created_at, flagged_content.platform, flagged_content.content_type, flag.reason)])
+    
     db.session.add(flag)
     db.session.commit()
+    invalidate_url_cache(flagged_content.url_hash)
+    trending_tracker.record(flagged_content.url_hash)
+    
+    if not created:
+        return jsonify({
+            'message': 'Content already flagged, added your flag',
+            'flagged_content': flagged_content.to_dict(),
+            'flag': flag.to_dict()
+        }), 200
+    
+    refresh_url_filter(force=True)
     
     return jsonify({
         'message': 'Content flagged successfully',
@@ -177,6 +519,196 @@ def create_flagged_content():
         'flag': flag.to_dict()
     }), 201
 
+# Apply validated flag records grouped by canonical URL hash ({url_hash: [record indexes]}) in one
+# transaction: one upsert row per URL, one executemany for the flags and one update per domain.
+# Returns {url_hash: (flagged_content_id, domain, created, content_type, platform)}.
+def apply_flag_groups(records, groups):
+    # One upsert row per URL; the first record supplies the content fields. Rows are written in
+    # url_hash order (and domains in name order below) so concurrent batches lock rows in the
+    # same order instead of deadlocking.
+    upsert_rows = []
+    for url_hash in sorted(groups):
+        indexes = groups[url_hash]
+        first = records[indexes[0]]
+        upsert_rows.append({
+            'url': first['url'],
+            'content_type': first['content_type'],
+            'title': first.get('title'),
+            'platform': first.get('platform'),
+            'description': first.get('description'),
+            'flag_count': len(indexes)
+        })
+    
+    upserted = {}
+    for start in range(0, len(upsert_rows), BULK_UPSERT_BATCH_SIZE):
+        upserted.update(FlaggedContent.upsert_many(upsert_rows[start:start + BULK_UPSERT_BATCH_SIZE]))
+    
+    # Insert all flags in a single executemany
+    flag_rows = []
+    rollup_flags = []
+    trending_flags = []
+    domain_changes = {}  # domain -> (new content, new flags)
+    for url_hash, indexes in groups.items():
+        content_id, domain, created, content_type, platform = upserted[url_hash]
+        for index in indexes:
+            flag_rows.append({
+                'reason': records[index]['reason'],
+                'details': records[index].get('details'),
+                'flagged_content_id': content_id,
+                'user_id': records[index].get('user_id'),
+                'created_at': records[index].get('created_at') or datetime.utcnow()
+            })
+            rollup_flags.append((flag_rows[-1]['created_at'], platform, content_type, records[index]['reason']))
+            trending_flags.append((url_hash, flag_rows[-1]['created_at']))
+        
+        content, flags = domain_changes.get(domain, (0, 0))
+        domain_changes[domain] = (content + (1 if created else 0), flags + len(indexes))
+    
+    if flag_rows:
+        db.session.execute(insert(Flag), flag_rows)
+    
+    for domain, (content, flags) in sorted(domain_changes.items(), key=lambda item: item[0] or ''):
+        DomainStats.record(domain, content=content, flags=flags, status_changes={'pending': content})
+    
+    new_content = [(content_type, platform, 1) for _, _, created, content_type, platform in upserted.values() if created]
+    StatisticsCounter.record(flags=len(flag_rows), status_changes={'pending': len(new_content)})
+    ContentBreakdown.record(new_content)
+    FlagRollup.record(rollup_flags)
+    
+    db.session.commit()
+    
+    for url_hash in groups:
+        invalidate_url_cache(url_hash)
+    for url_hash, created_at in trending_flags:
+        trending_tracker.record(url_hash, utc_timestamp(created_at))
+    if any(created for _, _, created, _, _ in upserted.values()):
+        refresh_url_filter(force=True)
+    
+    return upserted
+
+# Start the write-behind ingestion worker for this process (called once at startup)
+def start_ingest_worker(app):
+    global ingest_queue, ingest_worker
+    
+    if not INGEST_ASYNC or ingest_worker is not None:
+        return
+    
+    def apply_batch(queued):
+        with app.app_context():
+            # Work on copies: a failing batch is passed again, in parts, to isolate bad records
+            records = []
+            groups = {}
+            for index, record in enumerate(queued):
+                record = dict(record)
+                record['created_at'] = datetime.fromisoformat(record.pop('queued_at'))
+                records.append(record)
+                groups.setdefault(hash_url(record['url']), []).append(index)
+            
+            try:
+                apply_flag_groups(records, groups)
+            except Exception:
+                db.session.rollback()
+                raise
+    
+    ingest_queue = DurableQueue(INGEST_QUEUE_DIR, max_depth=INGEST_MAX_QUEUE_DEPTH, fsync=INGEST_FSYNC)
+    ingest_worker = GroupCommitWorker(
+        ingest_queue,
+        apply_batch,
+        batch_size=INGEST_BATCH_SIZE,
+        flush_interval=INGEST_FLUSH_INTERVAL,
+        dead_letter_after=INGEST_DEAD_LETTER_AFTER
+    )
+    ingest_worker.start()
+
+# Helper function to read bulk flag records from a JSON array or an NDJSON body
+def read_bulk_records():
+    if request.mimetype == 'application/x-ndjson':
+        records = []
+        for line in request.get_data(as_text=True).splitlines():
+            if line.strip():
+                records.append(json.loads(line))
+        return records
+    
+    data = request.get_json()
+    if isinstance(data, dict):
+        data = data.get('flags')
+    if not isinstance(data, list):
+        raise ValueError('Expected a JSON array of flags or an object with a "flags" array')
+    return data
+
+# Helper function to validate one bulk flag record; returns an error message or None
+def validate_bulk_record(record):
+    if not isinstance(record, dict):
+        return 'Record must be an object'
+    
+    for field in ['url', 'content_type', 'reason']:
+        if not isinstance(record.get(field), str) or not record[field].strip():
+            return f'Missing required field: {field}'
+    
+    for field in ['title', 'platform', 'description', 'details']:
+        if record.get(field) is not None and not isinstance(record[field], str):
+            return f'Field must be a string: {field}'
+    
+    # Oversized values would fail the whole batch's transaction, so reject them per record
+    for field, max_length in BULK_FIELD_LENGTHS.items():
+        if record.get(field) is not None and len(record[field]) > max_length:
+            return f'Field is too long: {field} (at most {max_length} characters)'
+    
+    return None
+
+@flagged_content_bp.route('/flagged-content/bulk', methods=['POST'])
+def bulk_create_flagged_content():
+    started_at = time.perf_counter()
+    
+    # Bulk ingestion is reserved for API key partners
+    api_key = validate_api_key()
+    if not api_key:
+        return jsonify({'error': 'A valid API key is required'}), 401
+    
+    try:
+        records = read_bulk_records()
+    except ValueError as e:
+        return jsonify({'error': str(e) or 'Invalid request body'}), 400
+    
+    if len(records) > MAX_BULK_FLAGS:
+        return jsonify({'error': f'At most {MAX_BULK_FLAGS} flags can be submitted per request'}), 400
+    
+    # Validate records and group the valid ones by canonical URL
+    results = [None] * len(records)
+    groups = {}  # url_hash -> indexes of records for that URL
+    for index, record in enumerate(records):
+        error = validate_bulk_record(record)
+        if error:
+            results[index] = {'index': index, 'status': 'error', 'error': error}
+            continue
+        groups.setdefault(hash_url(record['url']), []).append(index)
+    
+    # Attribute every flag to the API key's user
+    for indexes in groups.values():
+        for index in indexes:
+            records[index]['user_id'] = api_key.user_id
+            records[index].pop('created_at', None)
+    
+    upserted = apply_flag_groups(records, groups)
+    
+    accepted = 0
+    for url_hash, indexes in groups.items():
+        content_id, _, created, _, _ = upserted[url_hash]
+        for index in indexes:
+            results[index] = {'index': index, 'status': 'ok', 'flagged_content_id': content_id, 'created': created}
+            accepted += 1
+    
+    elapsed = time.perf_counter() - started_at
+    
+    return jsonify({
+        'results': results,
+        'accepted': accepted,
+        'rejected': len(records) - accepted,
+        'urls': len(groups),
+        'elapsed_ms': round(elapsed * 1000, 1),
+        'rows_per_second': round(accepted / elapsed, 1) if elapsed > 0 else None
+    }), 200
+
 @flagged_content_bp.route('/flagged-content/<int:content_id>', methods=['PUT'])
 @jwt_required()
 def update_flagged_content(content_id):
@@ -192,19 +724,32 @@ def update_flagged_content(content_id):
     if 'title' in data:
         flagged_content.title = data['title']
     
+    previous_breakdown = (flagged_content.content_type, flagged_content.platform)
+    
     if 'content_type' in data:
         flagged_content.content_type = data['content_type']
     
     if 'platform' in data:
         flagged_content.platform = data['platform']
     
+    if (flagged_content.content_type, flagged_content.platform) != previous_breakdown:
+        ContentBreakdown.record([(*previous_breakdown, -1), (flagged_content.content_type, flagged_content.platform, 1)])
+    
     if 'description' in data:
         flagged_content.description = data['description']
     
-    if 'verification_status' in data:
+    if 'verification_status' in data and data['verification_status'] != flagged_content.verification_status:
+        DomainStats.record(
+            flagged_content.domain,
+            status_changes={flagged_content.verification_status: -1, data['verification_status']: 1}
+        )
+        StatisticsCounter.record(status_changes={flagged_content.verification_status: -1, data['verification_status']: 1})
         flagged_content.verification_status = data['verification_status']
+        flagged_content.claimed_by_id = None
+        flagged_content.claim_expires_at = None
     
     db.session.commit()
+    invalidate_url_cache(flagged_content.url_hash)
     
     return jsonify({
         'message': 'Content updated successfully',
@@ -221,14 +766,42 @@ def delete_flagged_content(content_id):
     
     flagged_content = FlaggedContent.query.get_or_404(content_id)
     
-    # Delete screenshot if exists
-    if flagged_content.screenshot_path:
-        screenshot_path = os.path.join(current_app.static_folder, flagged_content.screenshot_path)
-        if os.path.exists(screenshot_path):
-            os.remove(screenshot_path)
+    # Release the screenshot; the file itself is only removed with its last reference
+    screenshot_path = flagged_content.screenshot_path
+    last_screenshot_reference = bool(screenshot_path) and Screenshot.release(screenshot_path)
+    
+    # Make sure the filter has seen this row before it is removed from it
+    refresh_url_filter(force=True)
+    
+    url_hash = flagged_content.url_hash
+    
+    DomainStats.record(
+        flagged_content.domain,
+        content=-1,
+        flags=-(flagged_content.flag_count or 0),
+        status_changes={flagged_content.verification_status: -1}
+    )
+    StatisticsCounter.record(
+        flags=-(flagged_content.flag_count or 0),
+        status_changes={flagged_content.verification_status: -1}
+    )
+    ContentBreakdown.record([(flagged_content.content_type, flagged_content.platform, -1)])
+    
+    # Leave a tombstone so syncing extensions drop the URL
+    db.session.add(DeletedContent(
+        flagged_content_id=flagged_content.id,
+        url=flagged_content.url,
+        url_hash=url_hash
+    ))
     
     db.session.delete(flagged_content)
     db.session.commit()
+    invalidate_url_cache(url_hash)
+    if url_filter_state['ready']:
+        url_filter.remove(url_hash)
+    
+    if last_screenshot_reference:
+        screenshot_processor.submit(remove_unreferenced_screenshot, current_app._get_current_object(), screenshot_path)
     
     return '', 204
 
@@ -239,14 +812,158 @@ def check_url():
     if not url:
         return jsonify({'error': 'URL parameter is required'}), 400
     
-    # Find content by URL
-    flagged_content = FlaggedContent.query.filter_by(url=url).first()
+    # Find content by canonical URL hash
+    url_hash = hash_url(url)
+    content = lookup_url_hashes([url_hash]).get(url_hash)
     
-    if not flagged_content:
+    if not content:
         return jsonify({'flagged': False}), 200
     
     return jsonify({
         'flagged': True,
-        'content': flagged_content.to_dict()
+        'content': content
+    }), 200
+
+
+@flagged_content_bp.route('/check-urls', methods=['POST'])
+def check_urls():
+    data = request.get_json(silent=True) or {}
+    urls = data.get('urls')
+    
+    if not isinstance(urls, list) or not urls:
+        return jsonify({'error': 'urls must be a non-empty list'}), 400
+    
+    if len(urls) > MAX_CHECK_URLS:
+        return jsonify({'error': f'At most {MAX_CHECK_URLS} URLs can be checked per request'}), 400
+    
+    if not all(isinstance(url, str) and url for url in urls):
+        return jsonify({'error': 'Every URL must be a non-empty string'}), 400
+    
+    # Resolve all URLs with a single query on the canonical URL hash
+    hashes = [hash_url(url) for url in urls]
+    content_by_hash = lookup_url_hashes(hashes)
+    
+    # Build results in input order
+    results = []
+    for url, url_hash in zip(urls, hashes):
+        content = content_by_hash.get(url_hash)
+        if content:
+            results.append({'url': url, 'flagged': True, 'content': content})
+        else:
+            results.append({'url': url, 'flagged': False})
+    
+    return jsonify({'results': results}), 200
+
+@flagged_content_bp.route('/check-url/stats', methods=['GET'])
+@jwt_required()
+def get_check_url_stats():
+    # Check user role
+    claims = get_jwt()
+    if claims.get('role') not in ['moderator', 'admin']:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    return jsonify({
+        'url_cache': url_cache.stats(),
+        'negative_url_cache': negative_url_cache.stats(),
+        'url_filter': {
+            **url_filter.stats(),
+            'enabled': URL_FILTER_ENABLED,
+            'ready': url_filter_state['ready'],
+            'rebuilds': url_filter_state['rebuilds'],
+            'checks': url_filter_state['checks'],
+            'definite_misses': url_filter_state['definite_misses']
+        }
+    }), 200
+
+@flagged_content_bp.route('/ingest/stats', methods=['GET'])
+@jwt_required()
+def get_ingest_stats():
+    # Check user role
+    claims = get_jwt()
+    if claims.get('role') not in ['moderator', 'admin']:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    if ingest_queue is None:
+        return jsonify({'enabled': False}), 200
+    
+    return jsonify({
+        'enabled': True,
+        'queue': ingest_queue.stats(),
+        'worker': ingest_worker.stats()
+    }), 200
+
+@flagged_content_bp.route('/ingest/dead-letters/requeue', methods=['POST'])
+@jwt_required()
+def requeue_dead_letters():
+    # Check user role
+    claims = get_jwt()
+    if claims.get('role') != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    if ingest_queue is None:
+        return jsonify({'error': 'Write-behind ingestion is not enabled'}), 400
+    
+    try:
+        requeued = ingest_queue.requeue_dead_letters()
+    except QueueFullError:
+        return jsonify({'error': 'Too many pending submissions, try again later'}), 503, {'Retry-After': '5'}
+    
+    ingest_worker.notify()
+    return jsonify({'requeued': requeued}), 200
+
+@flagged_content_bp.route('/trending', methods=['GET'])
+def get_trending():
+    window = request.args.get('window', TRENDING_DEFAULT_WINDOW)
+    limit = min(request.args.get('limit', 20, type=int), MAX_TRENDING_LIMIT)
+    verification_status = request.args.get('verification_status')
+    
+    if window not in TRENDING_WINDOWS:
+        return jsonify({'error': f"window must be one of: {', '.join(TRENDING_WINDOWS)}"}), 400
+    
+    if limit <= 0:
+        return jsonify({'error': 'limit must be positive'}), 400
+    
+    # Walk the ranked URL hashes, resolving them through the URL cache, until enough items match
+    ranked = trending_tracker.top(window)
+    items = []
+    for start in range(0, len(ranked), limit):
+        chunk = ranked[start:start + limit]
+        contents = lookup_url_hashes([url_hash for url_hash, _ in chunk])
+        for url_hash, flags in chunk:
+            content = contents.get(url_hash)
+            if content is None:
+                continue  # Deleted since it was flagged
+            if verification_status and content['verification_status'] != verification_status:
+                continue
+            items.append((url_hash, flags, content))
+        
+        if len(items) >= limit:
+            break
+    items = items[:limit]
+    
+    counts = trending_tracker.counts([url_hash for url_hash, _, _ in items])
+    window_hours = TRENDING_WINDOWS[window] / 3600
+    
+    return jsonify({
+        'window': window,
+        'window_seconds': TRENDING_WINDOWS[window],
+        'windows': list(TRENDING_WINDOWS),
+        'items': [{
+            **content,
+            'trending': {
+                'flags': flags,
+                'flags_per_hour': round(flags / window_hours, 2),
+                'windows': counts[url_hash]
+            }
+        } for url_hash, flags, content in items]
     }), 200
 
+@flagged_content_bp.route('/trending/stats', methods=['GET'])
+@jwt_required()
+def get_trending_stats():
+    # Check user role
+    claims = get_jwt()
+    if claims.get('role') not in ['moderator', 'admin']:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    return jsonify(trending_tracker.stats()), 200
@@ -4,6 +4,7 @@ from flask_oauthlib.client import OAuth
 import os
 from datetime import datetime, timedelta
 from src.models.user import db, User
+from src.models.statistics import StatisticsCounter
 
 google_auth_bp = Blueprint('google_auth', __name__)
 
@@ -103,6 +104,7 @@ def google_callback():
             profile_image=picture
         )
         db.session.add(user)
+        StatisticsCounter.record(users=1)
         db.session.commit()
     
     # Create JWT tokens
@@ -1,10 +1,70 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+import hashlib
+import json
+import os
+import threading
+import time
 from flask import Blueprint, jsonify, request
-from sqlalchemy import func
-from src.models import db, Statistics, FlaggedContent, User, Flag
+from flask_jwt_extended import jwt_required, get_jwt
+from sqlalchemy import func, text
+from src.models import db, Statistics, StatisticsCounter, ContentBreakdown, Flag, User, FlagRollup
+from src.models.statistics import COUNTER_STATUS_COLUMNS
+from src.utils.responses import compact_json_response
 
 statistics_bp = Blueprint('statistics', __name__)
 
+# Seconds between full recounts of the running totals (they are otherwise maintained incrementally)
+STATISTICS_RECONCILE_INTERVAL = int(os.getenv('STATISTICS_RECONCILE_INTERVAL', '3600'))
+
+# The summary is served from an in-memory snapshot. A background thread checks every
+# STATISTICS_SUMMARY_POLL_INTERVAL seconds whether the running totals changed (a constant-time
+# read) and rebuilds the snapshot if they did, and at least every STATISTICS_SUMMARY_MAX_AGE seconds.
+STATISTICS_SUMMARY_POLL_INTERVAL = float(os.getenv('STATISTICS_SUMMARY_POLL_INTERVAL', '5'))
+STATISTICS_SUMMARY_MAX_AGE = float(os.getenv('STATISTICS_SUMMARY_MAX_AGE', '300'))
+summary_lock = threading.Lock()
+summary_snapshot = {
+    'payload': None,
+    'etag': None,
+    'fingerprint': None,
+    'built_at': None,
+    'generated_at': None,
+    'last_modified': None,
+    'builds': 0,
+    'last_error': None
+}
+summary_refresher = None
+
+# Longest range, in days, a flag series can cover at each interval
+FLAG_SERIES_MAX_DAYS = {
+    'hour': 31,
+    'day': 731,
+    'week': 731
+}
+
+# Dimensions a flag series can be broken down by
+FLAG_SERIES_DIMENSIONS = ['platform', 'content_type', 'reason']
+
+# Daily snapshots are written by a background scheduler: one Statistics row per day at
+# STATISTICS_SNAPSHOT_TIME (UTC), plus history-based rows for missing days within the last
+# STATISTICS_BACKFILL_DAYS. Every worker runs the scheduler, but a job only runs in the one
+# holding a PostgreSQL advisory lock.
+STATISTICS_SCHEDULER_ENABLED = os.getenv('STATISTICS_SCHEDULER_ENABLED', 'true').lower() == 'true'
+STATISTICS_SNAPSHOT_TIME = datetime.strptime(os.getenv('STATISTICS_SNAPSHOT_TIME', '00:05'), '%H:%M').time()
+STATISTICS_SCHEDULER_INTERVAL = float(os.getenv('STATISTICS_SCHEDULER_INTERVAL', '60'))
+STATISTICS_BACKFILL_DAYS = int(os.getenv('STATISTICS_BACKFILL_DAYS', '365'))
+STATISTICS_SCHEDULER_LOCK_ID = 4711019  # Arbitrary; identifies the lock across processes and nodes
+statistics_scheduler = None
+scheduler_state = {
+    'backfilled_through': None,
+    'runs': 0,
+    'snapshots': 0,
+    'backfilled': 0,
+    'reconciles': 0,
+    'lock_busy': 0,
+    'last_run_at': None,
+    'last_error': None
+}
+
 @statistics_bp.route('/statistics', methods=['GET'])
 def get_statistics():
     # Get query parameters
@@ -16,37 +76,22 @@ def get_statistics():
     # Calculate start date
     start_date = datetime.utcnow().date() - timedelta(days=days)
     
-    # Get statistics for the specified period
+    # Get statistics for the specified period (written daily by the statistics scheduler)
     stats = Statistics.query.filter(Statistics.date >= start_date).order_by(Statistics.date).all()
     
-    # If no statistics are available, generate them
-    if not stats:
-        # Get the latest statistics
-        latest_stats = Statistics.query.order_by(Statistics.date.desc()).first()
-        
-        if not latest_stats:
-            # If no statistics exist, create initial statistics
-            update_statistics()
-            stats = Statistics.query.filter(Statistics.date >= start_date).order_by(Statistics.date).all()
-    
     return jsonify([stat.to_dict() for stat in stats]), 200
 
-@statistics_bp.route('/statistics/summary', methods=['GET'])
-def get_statistics_summary():
-    # Get the latest statistics
+# Helper function to compute the statistics summary (used to build the snapshot)
+def build_statistics_summary():
+    # Get the latest statistics (none until the scheduler has written its first snapshot)
     latest_stats = Statistics.query.order_by(Statistics.date.desc()).first()
     
-    if not latest_stats:
-        # If no statistics exist, create initial statistics
-        update_statistics()
-        latest_stats = Statistics.query.order_by(Statistics.date.desc()).first()
-    
     # Calculate growth rates (last 7 days)
     seven_days_ago = datetime.utcnow().date() - timedelta(days=7)
     old_stats = Statistics.query.filter(Statistics.date <= seven_days_ago).order_by(Statistics.date.desc()).first()
     
     growth_rates = {}
-    if old_stats:
+    if old_stats and latest_stats:
         growth_rates = {
             'flags_growth': calculate_growth_rate(old_stats.total_flags, latest_stats.total_flags),
             'users_growth': calculate_growth_rate(old_stats.total_users, latest_stats.total_users),
@@ -54,42 +99,191 @@ def get_statistics_summary():
             'verified_misleading_growth': calculate_growth_rate(old_stats.total_verified_misleading, latest_stats.total_verified_misleading)
         }
     
-    # Get platform distribution
-    platforms = db.session.query(
-        FlaggedContent.platform,
-        func.count(FlaggedContent.id).label('count')
-    ).group_by(FlaggedContent.platform).all()
-    
-    platform_distribution = {platform: count for platform, count in platforms if platform}
-    
-    # Get content type distribution
-    content_types = db.session.query(
-        FlaggedContent.content_type,
-        func.count(FlaggedContent.id).label('count')
-    ).group_by(FlaggedContent.content_type).all()
-    
-    content_type_distribution = {content_type: count for content_type, count in content_types}
+    # Get verification status distribution (from the running totals). Until the scheduler or
+    # POST /statistics/update has first counted them, report zeros rather than counting here.
+    totals = StatisticsCounter.totals()
+    verification_status_distribution = {
+        status: totals[column] if totals else 0 for status, column in COUNTER_STATUS_COLUMNS.items()
+    }
     
-    # Get verification status distribution
-    verification_statuses = db.session.query(
-        FlaggedContent.verification_status,
-        func.count(FlaggedContent.id).label('count')
-    ).group_by(FlaggedContent.verification_status).all()
+    # Get platform and content type distributions (maintained with the content, recounted with the totals)
+    distribution = ContentBreakdown.distribution()
+    platform_distribution = distribution['platform']
+    content_type_distribution = distribution['content_type']
     
-    verification_status_distribution = {status: count for status, count in verification_statuses}
-    
-    return jsonify({
+    return {
         'latest_stats': latest_stats.to_dict() if latest_stats else None,
         'growth_rates': growth_rates,
         'platform_distribution': platform_distribution,
         'content_type_distribution': content_type_distribution,
-        'verification_status_distribution': verification_status_distribution
-    }), 200
+        'verification_status_distribution': verification_status_distribution,
+        'totals_pending': totals is None
+    }
+
+# Helper function to cheaply detect changes that affect the summary
+def statistics_fingerprint():
+    totals = StatisticsCounter.totals()
+    latest_date = db.session.query(func.max(Statistics.date)).scalar()
+    return json.dumps([totals, latest_date, ContentBreakdown.distribution()], sort_keys=True, default=str)
+
+# Rebuild the summary snapshot if the statistics changed or it is too old
+def refresh_statistics_summary(force=False):
+    fingerprint = statistics_fingerprint()
+    with summary_lock:
+        if (not force and summary_snapshot['payload'] is not None
+                and summary_snapshot['fingerprint'] == fingerprint
+                and time.monotonic() - summary_snapshot['built_at'] < STATISTICS_SUMMARY_MAX_AGE):
+            return
+    
+    payload = build_statistics_summary()
+    etag = hashlib.sha1(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+    now = datetime.utcnow()
+    
+    with summary_lock:
+        # Last-Modified only moves when the content actually changes
+        if etag != summary_snapshot['etag']:
+            summary_snapshot['last_modified'] = now
+        summary_snapshot.update(
+            payload=payload,
+            etag=etag,
+            fingerprint=fingerprint,
+            built_at=time.monotonic(),
+            generated_at=now,
+            builds=summary_snapshot['builds'] + 1
+        )
+
+# Start the background summary refresher for this process (called once at startup)
+def start_statistics_refresher(app):
+    global summary_refresher
+    
+    if summary_refresher is not None:
+        return
+    
+    def run():
+        while True:
+            with app.app_context():
+                try:
+                    refresh_statistics_summary()
+                    summary_snapshot['last_error'] = None
+                except Exception as e:
+                    db.session.rollback()
+                    summary_snapshot['last_error'] = str(e)
+            time.sleep(STATISTICS_SUMMARY_POLL_INTERVAL)
+    
+    summary_refresher = threading.Thread(target=run, name='statistics-summary-refresher', daemon=True)
+    summary_refresher.start()
+
+@statistics_bp.route('/statistics/summary', methods=['GET'])
+def get_statistics_summary():
+    # Without the background refresher (e.g. in scripts), check for changes on demand
+    if summary_refresher is None or summary_snapshot['payload'] is None:
+        refresh_statistics_summary()
+    
+    with summary_lock:
+        snapshot = dict(summary_snapshot)
+    
+    response = jsonify({
+        **snapshot['payload'],
+        'snapshot_generated_at': snapshot['generated_at'].isoformat(),
+        'snapshot_age_seconds': round(time.monotonic() - snapshot['built_at'], 1)
+    })
+    
+    # Weak validators: the snapshot age in the body changes, the statistics don't
+    response.set_etag(snapshot['etag'], weak=True)
+    response.last_modified = snapshot['last_modified']
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+# Helper function to truncate rollup buckets to the requested interval in SQL
+def rollup_bucket_expression(interval):
+    if interval == 'hour':
+        return FlagRollup.bucket
+    
+    if db.engine.dialect.name == 'postgresql':
+        return func.date_trunc(interval, FlagRollup.bucket)
+    
+    # SQLite: weeks start on Monday, like date_trunc
+    if interval == 'week':
+        return func.strftime('%Y-%m-%d 00:00:00', FlagRollup.bucket, 'weekday 0', '-6 days')
+    return func.strftime('%Y-%m-%d 00:00:00', FlagRollup.bucket)
+
+# Helper function to parse an ISO 8601 query parameter as a naive UTC datetime
+def parse_time_arg(name, default):
+    value = request.args.get(name)
+    if not value:
+        return default
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    # Timestamps are stored as naive UTC, so convert offsets rather than dropping them
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+@statistics_bp.route('/statistics/flags', methods=['GET'])
+def get_flag_series():
+    interval = request.args.get('interval', 'day')
+    if interval not in FLAG_SERIES_MAX_DAYS:
+        return jsonify({'error': f"interval must be one of: {', '.join(FLAG_SERIES_MAX_DAYS)}"}), 400
+    
+    try:
+        end = parse_time_arg('end', datetime.utcnow())
+        start = parse_time_arg('start', end - timedelta(days=7))
+    except ValueError:
+        return jsonify({'error': 'start and end must be ISO 8601 timestamps'}), 400
+    
+    if start >= end:
+        return jsonify({'error': 'start must be before end'}), 400
+    
+    if end - start > timedelta(days=FLAG_SERIES_MAX_DAYS[interval]):
+        return jsonify({'error': f'At most {FLAG_SERIES_MAX_DAYS[interval]} days can be requested at {interval} interval'}), 400
+    
+    group_by = [dimension for dimension in request.args.get('group_by', '').split(',') if dimension]
+    if any(dimension not in FLAG_SERIES_DIMENSIONS for dimension in group_by):
+        return jsonify({'error': f"group_by must be a comma-separated list of: {', '.join(FLAG_SERIES_DIMENSIONS)}"}), 400
+    
+    # Aggregate the hourly rollups into the requested interval in the database
+    bucket = rollup_bucket_expression(interval).label('bucket')
+    dimensions = [getattr(FlagRollup, dimension) for dimension in group_by]
+    query = db.session.query(bucket, *dimensions, func.sum(FlagRollup.flag_count)) \
+        .filter(FlagRollup.bucket >= FlagRollup.bucket_for(start), FlagRollup.bucket < end)
+    
+    # Apply filters
+    for dimension in FLAG_SERIES_DIMENSIONS:
+        if request.args.get(dimension):
+            query = query.filter(getattr(FlagRollup, dimension) == request.args[dimension])
+    
+    rows = query.group_by(bucket, *dimensions).order_by(bucket, *dimensions).all()
+    
+    series = []
+    for row in rows:
+        bucket_start = row[0] if isinstance(row[0], datetime) else datetime.fromisoformat(row[0])
+        point = {'bucket': bucket_start.isoformat(), 'count': int(row[-1])}
+        for dimension, value in zip(group_by, row[1:-1]):
+            point[dimension] = value or None
+        series.append(point)
+    
+    return compact_json_response({
+        'interval': interval,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'group_by': group_by,
+        'series': series,
+        'total': sum(point['count'] for point in series)
+    })
 
 @statistics_bp.route('/statistics/update', methods=['POST'])
+@jwt_required()
 def update_statistics_endpoint():
-    update_statistics()
-    return jsonify({'message': 'Statistics updated successfully'}), 200
+    # Check user role
+    claims = get_jwt()
+    if claims.get('role') not in ['moderator', 'admin']:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    # Recount from the tables, backfill missing days and snapshot today
+    result = run_statistics_jobs(force=True)
+    if result is None:
+        return jsonify({'error': 'Statistics are being updated by another worker, try again later'}), 409
+    
+    return jsonify({'message': 'Statistics updated successfully', **result}), 200
 
 def calculate_growth_rate(old_value, new_value):
     if old_value == 0:
@@ -97,9 +291,15 @@ def calculate_growth_rate(old_value, new_value):
     
     return ((new_value - old_value) / old_value) * 100
 
-def update_statistics():
+def update_statistics(reconcile=False):
     today = datetime.utcnow().date()
     
+    # Running totals are kept up to date as flags, users and verifications change,
+    # and only recounted from the tables periodically to correct any drift
+    totals = None if reconcile else StatisticsCounter.totals()
+    if totals is None or datetime.utcnow() - totals['reconciled_at'] > timedelta(seconds=STATISTICS_RECONCILE_INTERVAL):
+        totals = StatisticsCounter.reconcile()
+    
     # Check if statistics for today already exist
     existing_stats = Statistics.query.filter_by(date=today).first()
     
@@ -109,15 +309,127 @@ def update_statistics():
         stats = Statistics(date=today)
     
     # Update statistics
-    stats.total_flags = Flag.query.count()
-    stats.total_users = User.query.count()
-    stats.total_verified_fake = FlaggedContent.query.filter_by(verification_status='verified_fake').count()
-    stats.total_verified_misleading = FlaggedContent.query.filter_by(verification_status='verified_misleading').count()
-    stats.total_verified_true = FlaggedContent.query.filter_by(verification_status='verified_true').count()
-    stats.total_pending = FlaggedContent.query.filter_by(verification_status='pending').count()
+    stats.total_flags = totals['total_flags']
+    stats.total_users = totals['total_users']
+    stats.total_verified_fake = totals['total_verified_fake']
+    stats.total_verified_misleading = totals['total_verified_misleading']
+    stats.total_verified_true = totals['total_verified_true']
+    stats.total_pending = totals['total_pending']
     
     db.session.add(stats)
     db.session.commit()
     
     return stats
 
+# Helper function to take the statistics scheduler lock for the current transaction.
+# Returns False if another worker holds it. Other databases have no advisory locks;
+# the unique date column still prevents duplicate rows there.
+def try_statistics_lock():
+    if db.engine.dialect.name != 'postgresql':
+        return True
+    
+    return bool(db.session.execute(
+        text('SELECT pg_try_advisory_xact_lock(:lock_id)'),
+        {'lock_id': STATISTICS_SCHEDULER_LOCK_ID}
+    ).scalar())
+
+def backfill_statistics(today):
+    """Add history-based rows for missing days before today. Returns the number of rows added.
+    
+    Nothing is committed.
+    """
+    earliest = [
+        db.session.query(func.min(Statistics.date)).scalar(),
+        db.session.query(func.min(Flag.created_at)).scalar(),
+        db.session.query(func.min(User.created_at)).scalar()
+    ]
+    earliest = [value.date() if isinstance(value, datetime) else value for value in earliest if value]
+    if not earliest:
+        return 0
+    
+    start = max(min(earliest), today - timedelta(days=STATISTICS_BACKFILL_DAYS))
+    existing = {
+        date for (date,) in db.session.query(Statistics.date).filter(Statistics.date >= start, Statistics.date < today)
+    }
+    
+    missing = [start + timedelta(days=offset) for offset in range((today - start).days)]
+    missing = [day for day in missing if day not in existing]
+    
+    # One pass over the tables for the whole range, however many days are missing
+    db.session.add_all(Statistics.from_history(missing, STATISTICS_SNAPSHOT_TIME))
+    return len(missing)
+
+def run_statistics_jobs(now=None, force=False):
+    """Run whatever statistics work is due: reconcile the running totals, backfill missing days
+    and write today's snapshot. With force, all three run now.
+    
+    Returns what was done, or None if another worker holds the lock.
+    """
+    now = now or datetime.utcnow()
+    today = now.date()
+    result = {'reconciled': False, 'backfilled': 0, 'snapshot': False, 'rollups_rebuilt': False}
+    
+    # Recount the running totals when due
+    totals = StatisticsCounter.totals()
+    if force or totals is None or now - totals['reconciled_at'] > timedelta(seconds=STATISTICS_RECONCILE_INTERVAL):
+        if not try_statistics_lock():
+            db.session.rollback()
+            scheduler_state['lock_busy'] += 1
+            return None
+        StatisticsCounter.reconcile()  # Commits, which releases the lock
+        scheduler_state['reconciles'] += 1
+        result['reconciled'] = True
+    
+    # Gaps are looked for once a day; today's snapshot is due from STATISTICS_SNAPSHOT_TIME on
+    backfill_due = force or scheduler_state['backfilled_through'] != today
+    snapshot_due = force or (now.time() >= STATISTICS_SNAPSHOT_TIME and Statistics.query.filter_by(date=today).first() is None)
+    if not backfill_due and not snapshot_due:
+        db.session.rollback()
+        return result
+    
+    if not try_statistics_lock():
+        db.session.rollback()
+        scheduler_state['lock_busy'] += 1
+        return None
+    
+    result['backfilled'] = backfill_statistics(today)
+    scheduler_state['backfilled'] += result['backfilled']
+    
+    # Flag rollups start out empty; populate them from existing flags once
+    if FlagRollup.query.first() is None and Flag.query.first() is not None:
+        FlagRollup.rebuild()
+        result['rollups_rebuilt'] = True
+    
+    # Check again now that this worker holds the lock
+    if force or (snapshot_due and Statistics.query.filter_by(date=today).first() is None):
+        update_statistics()  # Commits the backfilled rows too
+        scheduler_state['snapshots'] += 1
+        result['snapshot'] = True
+    else:
+        db.session.commit()
+    
+    scheduler_state['backfilled_through'] = today
+    scheduler_state['runs'] += 1
+    scheduler_state['last_run_at'] = now.isoformat()
+    return result
+
+# Start the daily statistics scheduler for this process (called once at startup)
+def start_statistics_scheduler(app):
+    global statistics_scheduler
+    
+    if not STATISTICS_SCHEDULER_ENABLED or statistics_scheduler is not None:
+        return
+    
+    def run():
+        while True:
+            with app.app_context():
+                try:
+                    run_statistics_jobs()
+                    scheduler_state['last_error'] = None
+                except Exception as e:
+                    db.session.rollback()
+                    scheduler_state['last_error'] = str(e)
+            time.sleep(STATISTICS_SCHEDULER_INTERVAL)
+    
+    statistics_scheduler = threading.Thread(target=run, name='statistics-scheduler', daemon=True)
+    statistics_scheduler.start()
@@ -1,19 +1,103 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from flask_jwt_extended import verify_jwt_in_request, get_jwt
+from sqlalchemy import select
 from src.models.user import User, db
+from src.models.statistics import StatisticsCounter
+from src.routes.export import EXPORT_FETCH_SIZE, EXPORT_FORMATS, serialize_value, generate_rows, gzip_chunks
+from src.utils.pagination import COUNT_MODES, clamp_per_page, keyset_page, count_rows
+from src.utils.responses import accepts_gzip
 
 user_bp = Blueprint('user', __name__)
 
+# Columns that can be requested with `fields` (password hashes are never listed)
+USER_FIELDS = ['id', 'username', 'email', 'role', 'reputation_score', 'created_at', 'last_login']
+
+# Helper function to apply the role and reputation filters of the user listing
+def apply_user_filters(query):
+    if request.args.get('role'):
+        query = query.filter(User.role.in_(request.args['role'].split(',')))
+    
+    min_reputation = request.args.get('min_reputation', type=int)
+    if min_reputation is not None:
+        query = query.filter(User.reputation_score >= min_reputation)
+    
+    max_reputation = request.args.get('max_reputation', type=int)
+    if max_reputation is not None:
+        query = query.filter(User.reputation_score <= max_reputation)
+    
+    return query
+
 @user_bp.route('/users', methods=['GET'])
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    # Get query parameters
+    per_page = clamp_per_page(request.args.get('per_page', 50, type=int), 500)  # Limit to 500 users per page
+    after = request.args.get('after')  # Cursor from the previous page
+    count_mode = request.args.get('count', 'none')
+    export_format = request.args.get('format')  # ndjson or csv streams every matching user
+    
+    fields = request.args.get('fields')
+    fields = [field for field in fields.split(',') if field] if fields else USER_FIELDS
+    if any(field not in USER_FIELDS for field in fields):
+        return jsonify({'error': f"fields must be a comma-separated list of: {', '.join(USER_FIELDS)}"}), 400
+    
+    if count_mode not in COUNT_MODES:
+        return jsonify({'error': f"count must be one of: {', '.join(COUNT_MODES)}"}), 400
+    
+    if export_format is not None:
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+        
+        # Check user role
+        verify_jwt_in_request()
+        if get_jwt().get('role') != 'admin':
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        return stream_users(fields, export_format)
+    
+    # Select only the requested columns (plus the keyset columns) instead of loading User objects
+    selected = list(dict.fromkeys(fields + ['created_at', 'id']))
+    query = apply_user_filters(db.session.query(*[getattr(User, field) for field in selected]))
+    
+    try:
+        rows, next_cursor = keyset_page(query, User.created_at, User.id, after, per_page)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    
+    return jsonify({
+        'items': [{field: serialize_value(getattr(row, field)) for field in fields} for row in rows],
+        'next_cursor': next_cursor,
+        'total': count_rows(query, count_mode),
+        'per_page': per_page
+    }), 200
+
+# Stream every matching user as NDJSON or CSV from a server-side cursor
+def stream_users(fields, export_format):
+    statement = select(*[getattr(User, field) for field in fields])
+    statement = apply_user_filters(statement) \
+        .order_by(User.id) \
+        .execution_options(yield_per=EXPORT_FETCH_SIZE)
+    
+    chunks = generate_rows(statement, fields, export_format)
+    
+    extension = 'csv' if export_format == 'csv' else 'ndjson'
+    headers = {
+        'Content-Disposition': f'attachment; filename="users.{extension}"',
+        'Vary': 'Accept-Encoding'
+    }
+    
+    if request.args.get('gzip') == '1' or accepts_gzip():
+        chunks = gzip_chunks(chunks)
+        headers['Content-Encoding'] = 'gzip'
+    
+    return Response(stream_with_context(chunks), mimetype=EXPORT_FORMATS[export_format], headers=headers)
 
 @user_bp.route('/users', methods=['POST'])
 def create_user():
-    
+
     data = request.json
     user = User(username=data['username'], email=data['email'])
     db.session.add(user)
+    StatisticsCounter.record(users=1)
     db.session.commit()
     return jsonify(user.to_dict()), 201
 
@@ -35,5 +119,6 @@ def update_user(user_id):
 def delete_user(user_id):
     user = User.query.get_or_404(user_id)
     db.session.delete(user)
+    StatisticsCounter.record(users=-1)
     db.session.commit()
     return '', 204
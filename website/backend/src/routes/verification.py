@@ -1,10 +1,281 @@
+from datetime import datetime, timedelta
 import json
+import os
+import threading
+import time
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
-from src.models import db, Verification, FlaggedContent, User
+from sqlalchemy import func, insert, or_, text
+from sqlalchemy.orm import joinedload
+from src.models import db, Verification, FlaggedContent, Flag, User, DomainStats, StatisticsCounter
+from src.routes.flagged_content import invalidate_url_cache
+from src.utils.pagination import COUNT_MODES, clamp_per_page, keyset_page, count_rows
 
 verification_bp = Blueprint('verification', __name__)
 
+# Review queue: moderators claim the highest priority pending content for a lease period, so two
+# moderators never work on the same item. Priorities are recomputed in the background (see
+# run_review_queue_jobs) from flag counts, recent flags and the domain's verification history.
+REVIEW_CLAIM_LEASE = int(os.getenv('REVIEW_CLAIM_LEASE', '900'))  # Seconds
+MAX_REVIEW_CLAIM_LEASE = 3600
+MAX_REVIEW_CLAIM_COUNT = 50
+REVIEW_VELOCITY_WINDOW = timedelta(seconds=int(os.getenv('REVIEW_VELOCITY_WINDOW', '3600')))
+REVIEW_VELOCITY_WEIGHT = float(os.getenv('REVIEW_VELOCITY_WEIGHT', '5'))
+REVIEW_DOMAIN_WEIGHT = float(os.getenv('REVIEW_DOMAIN_WEIGHT', '1'))
+REVIEW_QUEUE_ENABLED = os.getenv('REVIEW_QUEUE_ENABLED', 'true').lower() == 'true'
+REVIEW_QUEUE_INTERVAL = float(os.getenv('REVIEW_QUEUE_INTERVAL', '30'))
+REVIEW_QUEUE_FULL_REFRESH_INTERVAL = float(os.getenv('REVIEW_QUEUE_FULL_REFRESH_INTERVAL', '3600'))
+REVIEW_QUEUE_BATCH_SIZE = int(os.getenv('REVIEW_QUEUE_BATCH_SIZE', '5000'))  # Rows per transaction in a full pass
+REVIEW_QUEUE_LOCK_ID = 4711022  # Arbitrary; identifies the lock across processes and nodes
+review_queue_refresher = None
+review_queue_state = {
+    'runs': 0,
+    'last_run_at': None,
+    'last_full_refresh_at': None,
+    'last_error': None,
+    'prioritized': 0,
+    'expired_claims_released': 0
+}
+
+# Maximum number of decisions accepted by a single bulk verification request
+MAX_BULK_VERIFICATIONS = 1000
+
+VERIFICATION_STATUSES = ['pending', 'verified_fake', 'verified_misleading', 'verified_true']
+
+# Helper function to store evidence links given as a list as a JSON array
+def serialize_evidence_links(evidence_links):
+    if isinstance(evidence_links, list):
+        return json.dumps(evidence_links)
+    return evidence_links
+
+# Helper function to serialize content for the review queue, including its priority and claim
+def review_item(flagged_content):
+    item = flagged_content.to_dict()
+    item['review_priority'] = flagged_content.review_priority
+    item['claimed_by_id'] = flagged_content.claimed_by_id
+    item['claim_expires_at'] = flagged_content.claim_expires_at.isoformat() if flagged_content.claim_expires_at else None
+    return item
+
+# Helper function to take the review queue lock for the current transaction.
+# Returns False if another worker holds it; other databases have no advisory locks.
+def try_review_queue_lock():
+    if db.engine.dialect.name != 'postgresql':
+        return True
+    
+    return bool(db.session.execute(
+        text('SELECT pg_try_advisory_xact_lock(:lock_id)'),
+        {'lock_id': REVIEW_QUEUE_LOCK_ID}
+    ).scalar())
+
+# Helper function to recompute every pending priority in id-ordered batches of
+# REVIEW_QUEUE_BATCH_SIZE rows, committing after each one so no transaction holds the
+# row locks of the whole table. Returns (rows updated, whether the pass completed).
+def refresh_all_review_priorities():
+    prioritized = 0
+    after_id = 0
+    while True:
+        # Committing releases the lock; stop if another worker took it in between
+        if not try_review_queue_lock():
+            db.session.rollback()
+            return prioritized, False
+        
+        up_to_id = db.session.query(FlaggedContent.id) \
+            .filter(FlaggedContent.id > after_id) \
+            .order_by(FlaggedContent.id) \
+            .offset(REVIEW_QUEUE_BATCH_SIZE - 1) \
+            .limit(1) \
+            .scalar()
+        prioritized += FlaggedContent.refresh_review_priority(
+            REVIEW_VELOCITY_WINDOW,
+            velocity_weight=REVIEW_VELOCITY_WEIGHT,
+            domain_weight=REVIEW_DOMAIN_WEIGHT,
+            after_id=after_id,
+            up_to_id=up_to_id
+        )
+        db.session.commit()
+        
+        if up_to_id is None:
+            return prioritized, True
+        after_id = up_to_id
+
+def run_review_queue_jobs(now=None, full=False):
+    """Release expired claims and recompute priorities. Commits.
+    
+    Only content updated within the last velocity window (plus a margin of two runs) is
+    reprioritized, except for a full pass every REVIEW_QUEUE_FULL_REFRESH_INTERVAL seconds that
+    picks up changes in domain history. Returns a summary, or None if another worker holds the lock.
+    """
+    now = now or datetime.utcnow()
+    if not try_review_queue_lock():
+        db.session.rollback()
+        return None
+    
+    last_full = review_queue_state['last_full_refresh_at']
+    full = full or last_full is None or (now - last_full).total_seconds() >= REVIEW_QUEUE_FULL_REFRESH_INTERVAL
+    
+    released = FlaggedContent.release_claims(expired_before=now)
+    if full:
+        db.session.commit()
+        prioritized, completed = refresh_all_review_priorities()
+    else:
+        prioritized = FlaggedContent.refresh_review_priority(
+            REVIEW_VELOCITY_WINDOW,
+            velocity_weight=REVIEW_VELOCITY_WEIGHT,
+            domain_weight=REVIEW_DOMAIN_WEIGHT,
+            since=now - REVIEW_VELOCITY_WINDOW - timedelta(seconds=2 * REVIEW_QUEUE_INTERVAL)
+        )
+        db.session.commit()
+    
+    # An interrupted full pass is retried on the next run
+    if full and completed:
+        review_queue_state['last_full_refresh_at'] = now
+    review_queue_state['runs'] += 1
+    review_queue_state['last_run_at'] = now
+    review_queue_state['prioritized'] += prioritized
+    review_queue_state['expired_claims_released'] += released
+    return {'full': full, 'prioritized': prioritized, 'expired_claims_released': released}
+
+# Start the review queue priority refresher for this process (called once at startup)
+def start_review_queue_refresher(app):
+    global review_queue_refresher
+    
+    if not REVIEW_QUEUE_ENABLED or review_queue_refresher is not None:
+        return
+    
+    def run():
+        while True:
+            with app.app_context():
+                try:
+                    run_review_queue_jobs()
+                    review_queue_state['last_error'] = None
+                except Exception as e:
+                    db.session.rollback()
+                    review_queue_state['last_error'] = str(e)
+            time.sleep(REVIEW_QUEUE_INTERVAL)
+    
+    review_queue_refresher = threading.Thread(target=run, name='review-queue-refresher', daemon=True)
+    review_queue_refresher.start()
+
+@verification_bp.route('/review-queue', methods=['GET'])
+@jwt_required()
+def get_review_queue():
+    # Check user role
+    claims = get_jwt()
+    if claims.get('role') not in ['moderator', 'admin']:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    moderator_id = get_jwt_identity()
+    now = datetime.utcnow()
+    
+    # Peek at the next unclaimed items without claiming them
+    upcoming = FlaggedContent.query \
+        .filter(FlaggedContent.verification_status == 'pending') \
+        .filter(or_(FlaggedContent.claimed_by_id.is_(None), FlaggedContent.claim_expires_at <= now)) \
+        .order_by(FlaggedContent.review_priority.desc().nulls_last(), FlaggedContent.created_at, FlaggedContent.id) \
+        .limit(limit) \
+        .all()
+    
+    my_claims = FlaggedContent.query \
+        .filter(FlaggedContent.claimed_by_id == moderator_id, FlaggedContent.claim_expires_at > now) \
+        .order_by(FlaggedContent.claim_expires_at) \
+        .all()
+    
+    return jsonify({
+        'items': [review_item(item) for item in upcoming],
+        'claimed': [review_item(item) for item in my_claims],
+        'refresher': {
+            **review_queue_state,
+            'last_run_at': review_queue_state['last_run_at'].isoformat() if review_queue_state['last_run_at'] else None,
+            'last_full_refresh_at': review_queue_state['last_full_refresh_at'].isoformat() if review_queue_state['last_full_refresh_at'] else None
+        }
+    }), 200
+
+@verification_bp.route('/review-queue/claim', methods=['POST'])
+@jwt_required()
+def claim_review_items():
+    # Check user role
+    claims = get_jwt()
+    if claims.get('role') not in ['moderator', 'admin']:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    count = data.get('count', 1)
+    lease = data.get('lease_seconds', REVIEW_CLAIM_LEASE)
+    
+    if not isinstance(count, int) or not 1 <= count <= MAX_REVIEW_CLAIM_COUNT:
+        return jsonify({'error': f'count must be between 1 and {MAX_REVIEW_CLAIM_COUNT}'}), 400
+    
+    if not isinstance(lease, int) or not 1 <= lease <= MAX_REVIEW_CLAIM_LEASE:
+        return jsonify({'error': f'lease_seconds must be between 1 and {MAX_REVIEW_CLAIM_LEASE}'}), 400
+    
+    claimed = FlaggedContent.claim_next(get_jwt_identity(), count, timedelta(seconds=lease))
+    db.session.commit()
+    
+    return jsonify({
+        'items': [review_item(item) for item in claimed],
+        'lease_seconds': lease
+    }), 200
+
+@verification_bp.route('/review-queue/extend', methods=['POST'])
+@jwt_required()
+def extend_review_claims():
+    # Check user role
+    claims = get_jwt()
+    if claims.get('role') not in ['moderator', 'admin']:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    lease = data.get('lease_seconds', REVIEW_CLAIM_LEASE)
+    
+    if ids is not None and (not isinstance(ids, list) or not all(isinstance(content_id, int) for content_id in ids)):
+        return jsonify({'error': 'ids must be a list of flagged content IDs'}), 400
+    
+    if not isinstance(lease, int) or not 1 <= lease <= MAX_REVIEW_CLAIM_LEASE:
+        return jsonify({'error': f'lease_seconds must be between 1 and {MAX_REVIEW_CLAIM_LEASE}'}), 400
+    
+    # Only claims that are still held can be extended; expired ones may already belong to someone else
+    now = datetime.utcnow()
+    query = FlaggedContent.query.filter(
+        FlaggedContent.claimed_by_id == get_jwt_identity(),
+        FlaggedContent.claim_expires_at > now
+    )
+    if ids is not None:
+        query = query.filter(FlaggedContent.id.in_(ids))
+    
+    extended = query.update(
+        {FlaggedContent.claim_expires_at: now + timedelta(seconds=lease), FlaggedContent.updated_at: FlaggedContent.updated_at},
+        synchronize_session=False
+    )
+    db.session.commit()
+    
+    return jsonify({
+        'extended': extended,
+        'claim_expires_at': (now + timedelta(seconds=lease)).isoformat()
+    }), 200
+
+@verification_bp.route('/review-queue/release', methods=['POST'])
+@jwt_required()
+def release_review_claims():
+    # Check user role
+    claims = get_jwt()
+    if claims.get('role') not in ['moderator', 'admin']:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    
+    if ids is not None and (not isinstance(ids, list) or not all(isinstance(content_id, int) for content_id in ids)):
+        return jsonify({'error': 'ids must be a list of flagged content IDs'}), 400
+    
+    # Admins can release anyone's claims on the given items; moderators only their own
+    moderator_id = None if claims.get('role') == 'admin' and ids is not None else get_jwt_identity()
+    released = FlaggedContent.release_claims(ids=ids, moderator_id=moderator_id)
+    db.session.commit()
+    
+    return jsonify({'released': released}), 200
+
 @verification_bp.route('/verifications', methods=['GET'])
 @jwt_required()
 def get_verifications():
@@ -15,8 +286,13 @@ def get_verifications():
     
     # Get query parameters
     page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 10, type=int), 100)  # Limit to 100 items per page
+    per_page = clamp_per_page(request.args.get('per_page', 10, type=int), 100)  # Limit to 100 items per page
     flagged_content_id = request.args.get('flagged_content_id', type=int)
+    after = request.args.get('after')  # Cursor from the previous page; switches to keyset pagination
+    count_mode = request.args.get('count', 'exact' if after is None else 'none')
+    
+    if count_mode not in COUNT_MODES:
+        return jsonify({'error': f"count must be one of: {', '.join(COUNT_MODES)}"}), 400
     
     # Build query
     query = Verification.query
@@ -25,21 +301,94 @@ def get_verifications():
     if flagged_content_id:
         query = query.filter(Verification.flagged_content_id == flagged_content_id)
     
+    # Cursor mode: seek past the previous page on the (created_at, id) index instead of using OFFSET
+    if after is not None:
+        try:
+            items, next_cursor = keyset_page(query, Verification.created_at, Verification.id, after, per_page)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        
+        return jsonify({
+            'items': [item.to_dict() for item in items],
+            'next_cursor': next_cursor,
+            'total': count_rows(query, count_mode),
+            'per_page': per_page
+        }), 200
+    
     # Order by created_at (newest first)
-    query = query.order_by(Verification.created_at.desc())
+    query = query.order_by(Verification.created_at.desc(), Verification.id.desc())
     
     # Paginate results
-    paginated_results = query.paginate(page=page, per_page=per_page, error_out=False)
+    paginated_results = query.paginate(page=page, per_page=per_page, error_out=False, count=count_mode == 'exact')
+    total = paginated_results.total if count_mode == 'exact' else count_rows(query, count_mode)
     
     # Prepare response
     return jsonify({
         'items': [item.to_dict() for item in paginated_results.items],
-        'total': paginated_results.total,
-        'pages': paginated_results.pages,
+        'total': total,
+        'pages': -(-total // per_page) if total is not None else None,
         'page': page,
         'per_page': per_page
     }), 200
 
+@verification_bp.route('/flagged-content/<int:content_id>/detail', methods=['GET'])
+@jwt_required()
+def get_flagged_content_detail(content_id):
+    # Check user role
+    claims = get_jwt()
+    if claims.get('role') not in ['moderator', 'admin']:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    # Get query parameters
+    flags_per_page = clamp_per_page(request.args.get('flags_per_page', 50, type=int), 200)
+    flags_after = request.args.get('flags_after')
+    verifications_per_page = clamp_per_page(request.args.get('verifications_per_page', 20, type=int), 100)
+    verifications_after = request.args.get('verifications_after')
+    
+    flagged_content = FlaggedContent.query.get_or_404(content_id)
+    
+    # Flag counts per reason from one aggregate instead of loading every flag
+    reason_counts = db.session.query(Flag.reason, func.count(Flag.id)) \
+        .filter(Flag.flagged_content_id == content_id) \
+        .group_by(Flag.reason) \
+        .order_by(func.count(Flag.id).desc(), Flag.reason) \
+        .all()
+    
+    # Newest flags and verifications first, one keyset page each; moderators are joined in
+    try:
+        flags, flags_cursor = keyset_page(
+            Flag.query.filter(Flag.flagged_content_id == content_id),
+            Flag.created_at, Flag.id, flags_after, flags_per_page
+        )
+        verifications, verifications_cursor = keyset_page(
+            Verification.query.options(joinedload(Verification.moderator)).filter(Verification.flagged_content_id == content_id),
+            Verification.created_at, Verification.id, verifications_after, verifications_per_page
+        )
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    
+    verification_items = []
+    for verification in verifications:
+        item = verification.to_dict()
+        item['moderator'] = {'id': verification.moderator.id, 'username': verification.moderator.username} if verification.moderator else None
+        verification_items.append(item)
+    
+    return jsonify({
+        'flagged_content': review_item(flagged_content),
+        'flag_reasons': [{'reason': reason, 'count': count} for reason, count in reason_counts],
+        'flags': {
+            'items': [flag.to_dict() for flag in flags],
+            'next_cursor': flags_cursor,
+            'total': sum(count for _, count in reason_counts),
+            'per_page': flags_per_page
+        },
+        'verifications': {
+            'items': verification_items,
+            'next_cursor': verifications_cursor,
+            'per_page': verifications_per_page
+        }
+    }), 200
+
 @verification_bp.route('/verifications/<int:verification_id>', methods=['GET'])
 @jwt_required()
 def get_verification_by_id(verification_id):
@@ -72,34 +421,207 @@ def create_verification():
     # Get moderator ID
     moderator_id = get_jwt_identity()
     
-    # Process evidence links
-    evidence_links = None
-    if 'evidence_links' in data and data['evidence_links']:
-        if isinstance(data['evidence_links'], list):
-            evidence_links = json.dumps(data['evidence_links'])
-        else:
-            evidence_links = data['evidence_links']
+    # Items claimed from the review queue are reserved for their moderator until the lease expires
+    if flagged_content.claim_is_held_by_other(moderator_id) and claims.get('role') != 'admin':
+        return jsonify({'error': 'Content is claimed by another moderator'}), 409
     
     # Create verification
     verification = Verification(
         status=data['status'],
         notes=data.get('notes'),
-        evidence_links=evidence_links,
+        evidence_links=serialize_evidence_links(data.get('evidence_links') or None),
         flagged_content_id=data['flagged_content_id'],
         moderator_id=moderator_id
     )
     
     # Update flagged content status
+    if flagged_content.verification_status != data['status']:
+        DomainStats.record(
+            flagged_content.domain,
+            status_changes={flagged_content.verification_status: -1, data['status']: 1}
+        )
+        StatisticsCounter.record(status_changes={flagged_content.verification_status: -1, data['status']: 1})
     flagged_content.verification_status = data['status']
+    flagged_content.claimed_by_id = None
+    flagged_content.claim_expires_at = None
     
     db.session.add(verification)
     db.session.commit()
+    invalidate_url_cache(flagged_content.url_hash)
     
     return jsonify({
         'message': 'Verification created successfully',
         'verification': verification.to_dict()
     }), 201
 
+# Helper function to turn a bulk verification body into decisions (dicts with flagged_content_id and status).
+# Top-level status, notes and evidence_links apply to every item that doesn't set its own.
+def read_bulk_decisions(data):
+    if not isinstance(data, dict):
+        raise ValueError('Expected a JSON object')
+    
+    defaults = {field: data[field] for field in ['status', 'notes', 'evidence_links'] if data.get(field) is not None}
+    
+    decisions = []
+    ids = data.get('flagged_content_ids')
+    if ids is not None:
+        if not isinstance(ids, list):
+            raise ValueError('flagged_content_ids must be a list')
+        decisions.extend({**defaults, 'flagged_content_id': content_id} for content_id in ids)
+    
+    items = data.get('items')
+    if items is not None:
+        if not isinstance(items, list):
+            raise ValueError('items must be a list')
+        decisions.extend({**defaults, **item} if isinstance(item, dict) else item for item in items)
+    
+    if not decisions:
+        raise ValueError('Provide flagged_content_ids or items')
+    return decisions
+
+# Helper function to validate one bulk decision; returns an error message or None
+def validate_bulk_decision(decision):
+    if not isinstance(decision, dict):
+        return 'Item must be an object'
+    
+    if not isinstance(decision.get('flagged_content_id'), int) or isinstance(decision['flagged_content_id'], bool):
+        return 'Missing required field: flagged_content_id'
+    
+    if decision.get('status') not in VERIFICATION_STATUSES:
+        return f"status must be one of: {', '.join(VERIFICATION_STATUSES)}"
+    
+    if decision.get('notes') is not None and not isinstance(decision['notes'], str):
+        return 'Field must be a string: notes'
+    
+    evidence_links = decision.get('evidence_links')
+    if evidence_links is not None and not isinstance(evidence_links, str) and not (
+            isinstance(evidence_links, list) and all(isinstance(link, str) for link in evidence_links)):
+        return 'evidence_links must be a string or a list of strings'
+    
+    return None
+
+@verification_bp.route('/verifications/bulk', methods=['POST'])
+@jwt_required()
+def bulk_create_verifications():
+    # Check user role
+    claims = get_jwt()
+    if claims.get('role') not in ['moderator', 'admin']:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    started_at = time.perf_counter()
+    moderator_id = get_jwt_identity()
+    
+    try:
+        decisions = read_bulk_decisions(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if len(decisions) > MAX_BULK_VERIFICATIONS:
+        return jsonify({'error': f'At most {MAX_BULK_VERIFICATIONS} items can be verified per request'}), 400
+    
+    # Validate decisions; each content item can only be decided once per request
+    results = [None] * len(decisions)
+    indexes = {}  # flagged_content_id -> index of its decision
+    for index, decision in enumerate(decisions):
+        error = validate_bulk_decision(decision)
+        if error is None and decision['flagged_content_id'] in indexes:
+            error = 'Duplicate flagged_content_id'
+        if error:
+            results[index] = {'index': index, 'status': 'error', 'error': error}
+            continue
+        indexes[decision['flagged_content_id']] = index
+    
+    # Load and lock the current state of every item in one query (in id order, so concurrent
+    # batches lock rows in the same order) so the counter deltas below are exact
+    current = {}
+    if indexes:
+        rows = FlaggedContent.query \
+            .filter(FlaggedContent.id.in_(indexes)) \
+            .order_by(FlaggedContent.id) \
+            .with_for_update() \
+            .all()
+        current = {row.id: row for row in rows}
+    
+    now = datetime.utcnow()
+    by_status = {}  # new status -> flagged content ids
+    verification_rows = []
+    domain_changes = {}  # domain -> {status: delta}
+    status_changes = {}
+    for content_id, index in indexes.items():
+        row = current.get(content_id)
+        if row is None:
+            results[index] = {'index': index, 'status': 'error', 'flagged_content_id': content_id, 'error': 'Flagged content not found'}
+            continue
+        
+        # Items claimed from the review queue are reserved for their moderator until the lease expires
+        if row.claim_is_held_by_other(moderator_id) and claims.get('role') != 'admin':
+            results[index] = {'index': index, 'status': 'error', 'flagged_content_id': content_id, 'error': 'Content is claimed by another moderator'}
+            continue
+        
+        decision = decisions[index]
+        by_status.setdefault(decision['status'], []).append(content_id)
+        verification_rows.append({
+            'status': decision['status'],
+            'notes': decision.get('notes'),
+            'evidence_links': serialize_evidence_links(decision.get('evidence_links') or None),
+            'flagged_content_id': content_id,
+            'moderator_id': moderator_id,
+            'created_at': now,
+            'updated_at': now
+        })
+        
+        if row.verification_status != decision['status']:
+            for changes in (domain_changes.setdefault(row.domain, {}), status_changes):
+                changes[row.verification_status] = changes.get(row.verification_status, 0) - 1
+                changes[decision['status']] = changes.get(decision['status'], 0) + 1
+        
+        results[index] = {
+            'index': index,
+            'status': 'ok',
+            'flagged_content_id': content_id,
+            'previous_status': row.verification_status,
+            'verification_status': decision['status']
+        }
+    
+    # One UPDATE per distinct status and one multi-row INSERT for the verifications
+    for status, content_ids in by_status.items():
+        db.session.query(FlaggedContent).filter(FlaggedContent.id.in_(content_ids)).update({
+            FlaggedContent.verification_status: status,
+            FlaggedContent.claimed_by_id: None,
+            FlaggedContent.claim_expires_at: None,
+            FlaggedContent.updated_at: now
+        }, synchronize_session=False)
+    
+    if verification_rows:
+        inserted = db.session.execute(
+            insert(Verification).returning(Verification.id, Verification.flagged_content_id),
+            verification_rows
+        ).all()
+        verification_ids = {content_id: verification_id for verification_id, content_id in inserted}
+        for content_id in verification_ids:
+            results[indexes[content_id]]['verification_id'] = verification_ids[content_id]
+    
+    # Upsert domain rows in name order too, so concurrent batches can't deadlock on them
+    for domain, changes in sorted(domain_changes.items(), key=lambda item: item[0] or ''):
+        DomainStats.record(domain, status_changes=changes)
+    StatisticsCounter.record(status_changes=status_changes)
+    
+    db.session.commit()
+    
+    for content_ids in by_status.values():
+        for content_id in content_ids:
+            invalidate_url_cache(current[content_id].url_hash)
+    
+    verified = len(verification_rows)
+    elapsed = time.perf_counter() - started_at
+    
+    return jsonify({
+        'results': results,
+        'verified': verified,
+        'failed': len(decisions) - verified,
+        'elapsed_ms': round(elapsed * 1000, 1)
+    }), 200
+
 @verification_bp.route('/verifications/<int:verification_id>', methods=['PUT'])
 @jwt_required()
 def update_verification(verification_id):
@@ -112,24 +634,30 @@ def update_verification(verification_id):
     data = request.json
     
     # Update fields
+    flagged_content = None
     if 'status' in data:
         verification.status = data['status']
         
         # Update flagged content status
         flagged_content = FlaggedContent.query.get(verification.flagged_content_id)
         if flagged_content:
+            if flagged_content.verification_status != data['status']:
+                DomainStats.record(
+                    flagged_content.domain,
+                    status_changes={flagged_content.verification_status: -1, data['status']: 1}
+                )
+                StatisticsCounter.record(status_changes={flagged_content.verification_status: -1, data['status']: 1})
             flagged_content.verification_status = data['status']
     
     if 'notes' in data:
         verification.notes = data['notes']
     
     if 'evidence_links' in data:
-        if isinstance(data['evidence_links'], list):
-            verification.evidence_links = json.dumps(data['evidence_links'])
-        else:
-            verification.evidence_links = data['evidence_links']
+        verification.evidence_links = serialize_evidence_links(data['evidence_links'])
     
     db.session.commit()
+    if flagged_content:
+        invalidate_url_cache(flagged_content.url_hash)
     
     return jsonify({
         'message': 'Verification updated successfully',
@@ -7,7 +7,7 @@ import random
 from flask import Flask
 from dotenv import load_dotenv
 
-from src.models import db, User, FlaggedContent, Flag, Verification, ApiKey, Statistics
+from src.models import db, User, FlaggedContent, Flag, Verification, ApiKey, Statistics, StatisticsCounter
 
 # Load environment variables
 load_dotenv()
@@ -338,6 +338,9 @@ def main():
         seed_api_keys(users)
         seed_statistics()
         
+        # Bring the running statistics totals in line with the seeded rows
+        StatisticsCounter.reconcile()
+        
         print("Database seeded successfully!")
 
 if __name__ == "__main__":
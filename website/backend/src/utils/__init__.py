@@ -0,0 +1,56 @@
+from src.utils.bloom import CountingBloomFilter
+from src.utils.cache import TTLCache
+from src.utils.cursors import encode_cursor, decode_cursor, parse_cursor_datetime
+from src.utils.ingest_queue import DurableQueue, GroupCommitWorker, QueueFullError
+from src.utils.pagination import COUNT_MODES, clamp_per_page, keyset_page, estimate_count, count_rows
+from src.utils.rate_limit import RateLimitResult, MemoryRateLimitBackend, RedisRateLimitBackend, RateLimiter
+from src.utils.responses import compact_json_response
+from src.utils.screenshots import (
+    ScreenshotError, ScreenshotTooLarge, UnsupportedScreenshot, ScreenshotProcessor,
+    stage_upload, place_upload, discard_upload, is_content_addressed, process_screenshot, remove_screenshot_files
+)
+from src.utils.static_files import SENDFILE_MODES, StaticManifest, static_file_response
+from src.utils.trending import parse_duration, SlidingWindowSketch, TrendingTracker
+from src.utils.write_buffer import WriteBehindBuffer
+from src.utils.urls import canonicalize_url, hash_url, registrable_domain
+
+__all__ = [
+    'CountingBloomFilter',
+    'TTLCache',
+    'encode_cursor',
+    'decode_cursor',
+    'parse_cursor_datetime',
+    'DurableQueue',
+    'GroupCommitWorker',
+    'QueueFullError',
+    'COUNT_MODES',
+    'clamp_per_page',
+    'keyset_page',
+    'estimate_count',
+    'count_rows',
+    'RateLimitResult',
+    'MemoryRateLimitBackend',
+    'RedisRateLimitBackend',
+    'RateLimiter',
+    'compact_json_response',
+    'ScreenshotError',
+    'ScreenshotTooLarge',
+    'UnsupportedScreenshot',
+    'ScreenshotProcessor',
+    'stage_upload',
+    'place_upload',
+    'discard_upload',
+    'is_content_addressed',
+    'process_screenshot',
+    'remove_screenshot_files',
+    'SENDFILE_MODES',
+    'StaticManifest',
+    'static_file_response',
+    'parse_duration',
+    'SlidingWindowSketch',
+    'TrendingTracker',
+    'WriteBehindBuffer',
+    'canonicalize_url',
+    'hash_url',
+    'registrable_domain'
+]
@@ -0,0 +1,79 @@
+import math
+import threading
+
+class CountingBloomFilter:
+    """Counting Bloom filter over hex digests, supporting deletes.
+    
+    Each slot is an 8-bit saturating counter, so the memory footprint is one byte per slot.
+    Items are expected to be hex-encoded hashes (such as FlaggedContent.url_hash); the
+    slot positions are derived from the digest itself by double hashing.
+    """
+    
+    MAX_COUNT = 255
+    
+    def __init__(self, capacity=1000000, error_rate=0.01):
+        if capacity <= 0:
+            raise ValueError('capacity must be positive')
+        if not 0 < error_rate < 1:
+            raise ValueError('error_rate must be between 0 and 1')
+        
+        self.capacity = capacity
+        self.error_rate = error_rate
+        
+        # Optimal number of slots and hash functions for the requested false-positive rate
+        self.num_slots = int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, int(round(self.num_slots / capacity * math.log(2))))
+        
+        self._counters = bytearray(self.num_slots)
+        self._lock = threading.Lock()
+        self.count = 0
+    
+    def _positions(self, digest):
+        h1 = int(digest[:16], 16)
+        h2 = int(digest[16:32], 16) | 1
+        return [(h1 + i * h2) % self.num_slots for i in range(self.num_hashes)]
+    
+    def add(self, digest):
+        with self._lock:
+            for position in self._positions(digest):
+                if self._counters[position] < self.MAX_COUNT:
+                    self._counters[position] += 1
+            self.count += 1
+    
+    def remove(self, digest):
+        positions = self._positions(digest)
+        with self._lock:
+            # Never decrement for an item that isn't present, it would corrupt other entries
+            if not all(self._counters[position] for position in positions):
+                return False
+            
+            for position in positions:
+                # Saturated counters have lost their true value and must stay set
+                if self._counters[position] < self.MAX_COUNT:
+                    self._counters[position] -= 1
+            self.count = max(0, self.count - 1)
+            return True
+    
+    def __contains__(self, digest):
+        counters = self._counters
+        return all(counters[position] for position in self._positions(digest))
+    
+    def clear(self):
+        with self._lock:
+            self._counters = bytearray(self.num_slots)
+            self.count = 0
+    
+    def estimated_error_rate(self):
+        # Standard approximation (1 - e^(-kn/m))^k for the current number of items
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_slots)) ** self.num_hashes
+    
+    def stats(self):
+        return {
+            'capacity': self.capacity,
+            'items': self.count,
+            'target_error_rate': self.error_rate,
+            'estimated_error_rate': self.estimated_error_rate(),
+            'num_slots': self.num_slots,
+            'num_hashes': self.num_hashes,
+            'memory_bytes': len(self._counters)
+        }
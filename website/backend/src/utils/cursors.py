@@ -0,0 +1,32 @@
+import base64
+import json
+from datetime import datetime
+
+def _serialize_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'Cannot encode {type(value).__name__} in a cursor')
+
+def encode_cursor(values):
+    """Encode a dict of keyset values as an opaque, URL-safe cursor token."""
+    raw = json.dumps(values, separators=(',', ':'), default=_serialize_value).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(token):
+    """Decode a cursor produced by encode_cursor(). Raises ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw)
+    except (TypeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+    
+    if not isinstance(payload, dict):
+        raise ValueError('Invalid cursor')
+    
+    return payload
+
+def parse_cursor_datetime(value):
+    """Parse an ISO timestamp stored in a cursor. Raises ValueError if it is malformed."""
+    if not isinstance(value, str):
+        raise ValueError('Invalid cursor')
+    return datetime.fromisoformat(value)
@@ -0,0 +1,305 @@
+import glob
+import json
+import os
+import re
+import threading
+import time
+
+class QueueFullError(Exception):
+    pass
+
+class DurableQueue:
+    """Append-only JSON-lines journal with a committed-offset checkpoint.
+    
+    Each process appends to its own journal file in `directory`, so appends never contend across
+    processes. Records are acknowledged once they are written (and fsynced, unless disabled).
+    A consumer reads batches from the checkpoint and advances it with commit() once the batch
+    has been applied, so delivery is at-least-once: a crash between applying a batch and
+    committing its offset replays that batch. Journals left behind by dead processes are
+    adopted on startup. Records that can't be applied are moved to a shared dead-letter file
+    (see dead_letter() and requeue_dead_letters()).
+    """
+    
+    def __init__(self, directory, max_depth=100000, fsync=True, compact_size=16 * 1024 * 1024):
+        self.directory = directory
+        self.max_depth = max_depth
+        self.fsync = fsync
+        self.compact_size = compact_size
+        
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f'flags-{os.getpid()}.log')
+        self._lock = threading.Lock()
+        self._file = open(self.path, 'ab')
+        self._pending_files = self._adopt_orphaned_journals()
+        
+        self.dead_letter_path = os.path.join(directory, 'dead-letter.log')
+        
+        self.depth = sum(self._count_unread(path) for path in self._pending_files + [self.path])
+        self.enqueued = 0
+        self.committed = 0
+        self.dead_lettered = 0
+    
+    def _offset_path(self, path):
+        return path + '.offset'
+    
+    def _read_offset(self, path):
+        try:
+            with open(self._offset_path(path)) as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+    
+    def _write_offset(self, path, offset):
+        # Write-then-rename so a crash never leaves a torn checkpoint
+        temp_path = self._offset_path(path) + '.tmp'
+        with open(temp_path, 'w') as f:
+            f.write(str(offset))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(temp_path, self._offset_path(path))
+    
+    def _count_unread(self, path):
+        with open(path, 'rb') as f:
+            f.seek(self._read_offset(path))
+            return sum(1 for line in f if line.strip())
+    
+    def _adopt_orphaned_journals(self):
+        adopted = []
+        for path in sorted(glob.glob(os.path.join(self.directory, 'flags-*.log'))):
+            match = re.match(r'flags-(\d+)', os.path.basename(path))
+            if not match or path == self.path or _process_alive(int(match.group(1))):
+                continue
+            
+            # Rename first so no other process adopts the same journal
+            target = os.path.join(self.directory, f'flags-{os.getpid()}-adopted-{len(adopted)}-{int(time.time())}.log')
+            try:
+                os.rename(path, target)
+            except FileNotFoundError:
+                continue
+            if os.path.exists(self._offset_path(path)):
+                os.replace(self._offset_path(path), self._offset_path(target))
+            adopted.append(target)
+        return adopted
+    
+    def put(self, record):
+        line = (json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8')
+        with self._lock:
+            if self.depth >= self.max_depth:
+                raise QueueFullError('Ingestion queue is full')
+            
+            self._file.write(line)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self.depth += 1
+            self.enqueued += 1
+    
+    def read_batch(self, max_records):
+        """Return (path, end_offset, records) for the next unread batch, or None if the queue is empty."""
+        for path in self._pending_files + [self.path]:
+            offset = self._read_offset(path)
+            records = []
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                while len(records) < max_records:
+                    line = f.readline()
+                    # Stop at a partially written last line; it is picked up once complete
+                    if not line or not line.endswith(b'\n'):
+                        break
+                    offset += len(line)
+                    if line.strip():
+                        records.append(json.loads(line))
+            
+            if records:
+                return path, offset, records
+            
+            if path != self.path:
+                # Adopted journal fully drained
+                self._remove_journal(path)
+        return None
+    
+    def commit(self, path, offset, count):
+        self._write_offset(path, offset)
+        with self._lock:
+            self.depth = max(0, self.depth - count)
+            self.committed += count
+            
+            # Start our own journal over once everything in it has been applied
+            if path == self.path and offset >= self.compact_size and offset == self._file.tell():
+                self._file.truncate(0)
+                self._file.seek(0)
+                self._write_offset(path, 0)
+    
+    def dead_letter(self, failures):
+        """Append (record, error) pairs to the dead-letter file, so they can be inspected and requeued."""
+        lines = b''.join(
+            (json.dumps({'record': record, 'error': error, 'failed_at': time.time()}, separators=(',', ':')) + '\n').encode('utf-8')
+            for record, error in failures
+        )
+        with self._lock:
+            with open(self.dead_letter_path, 'ab') as f:
+                f.write(lines)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            self.dead_lettered += len(failures)
+    
+    def requeue_dead_letters(self):
+        """Append every dead-lettered record to this process's journal again. Returns the number requeued.
+        
+        The dead-letter file is renamed first, so records dead-lettered meanwhile are kept for later.
+        Raises QueueFullError (keeping the remaining records) if the queue fills up.
+        """
+        claimed_path = f'{self.dead_letter_path}.requeue-{os.getpid()}'
+        if not os.path.exists(claimed_path):
+            try:
+                os.rename(self.dead_letter_path, claimed_path)
+            except FileNotFoundError:
+                return 0
+        
+        with open(claimed_path, 'rb') as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+        
+        requeued = 0
+        try:
+            for entry in entries:
+                self.put(entry['record'])
+                requeued += 1
+        finally:
+            remaining = entries[requeued:]
+            if remaining:
+                self.dead_letter([(entry['record'], entry['error']) for entry in remaining])
+                with self._lock:
+                    self.dead_lettered -= len(remaining)
+            os.remove(claimed_path)
+        return requeued
+    
+    def _dead_letter_depth(self):
+        try:
+            with open(self.dead_letter_path, 'rb') as f:
+                return sum(1 for line in f if line.strip())
+        except FileNotFoundError:
+            return 0
+    
+    def _remove_journal(self, path):
+        self._pending_files.remove(path)
+        for stale in [path, self._offset_path(path)]:
+            if os.path.exists(stale):
+                os.remove(stale)
+    
+    def stats(self):
+        return {
+            'journal': self.path,
+            'depth': self.depth,
+            'max_depth': self.max_depth,
+            'enqueued': self.enqueued,
+            'committed': self.committed,
+            'dead_lettered': self.dead_lettered,
+            'dead_letter_depth': self._dead_letter_depth(),
+            'adopted_journals': len(self._pending_files)
+        }
+
+class GroupCommitWorker(threading.Thread):
+    """Background thread that drains a DurableQueue in batches through `apply_batch(records)`.
+    
+    A batch is flushed when `batch_size` records are waiting or every `flush_interval` seconds.
+    A failing batch is retried as a whole (the failure is usually transient, e.g. the database
+    is unavailable) until it has been failing for `dead_letter_after` seconds. It is then split
+    in halves recursively to apply the records that can be applied, the ones that still fail on
+    their own are moved to the dead-letter file and the checkpoint moves past the batch.
+    `apply_batch` must not modify the records it is given, since they may be passed again.
+    """
+    
+    def __init__(self, queue, apply_batch, batch_size=500, flush_interval=1.0, dead_letter_after=300.0):
+        super().__init__(name='flag-ingest-worker', daemon=True)
+        self.queue = queue
+        self.apply_batch = apply_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dead_letter_after = dead_letter_after
+        self._wakeup = threading.Event()
+        self._failing_since = None
+        self.batches = 0
+        self.errors = 0
+        self.last_error = None
+        self.last_flush_at = None
+        self.last_batch_size = 0
+        self.last_batch_ms = None
+    
+    def notify(self):
+        if self.queue.depth >= self.batch_size:
+            self._wakeup.set()
+    
+    def run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.drain()
+    
+    def _apply_isolating(self, records):
+        """Apply records, halving failing batches down to single records. Returns [(record, error)] that failed."""
+        try:
+            self.apply_batch(records)
+            return []
+        except Exception as e:
+            if len(records) == 1:
+                return [(records[0], str(e))]
+        
+        middle = len(records) // 2
+        return self._apply_isolating(records[:middle]) + self._apply_isolating(records[middle:])
+    
+    def drain(self):
+        while True:
+            batch = self.queue.read_batch(self.batch_size)
+            if batch is None:
+                return
+            
+            path, offset, records = batch
+            started_at = time.perf_counter()
+            try:
+                self.apply_batch(records)
+            except Exception as e:
+                self.errors += 1
+                self.last_error = str(e)
+                
+                # Leave the batch in the journal and retry on the next flush, until it has been
+                # failing for long enough to look like a problem with the records themselves
+                if self._failing_since is None:
+                    self._failing_since = time.monotonic()
+                if time.monotonic() - self._failing_since < self.dead_letter_after:
+                    return
+                
+                failures = self._apply_isolating(records)
+                if failures:
+                    self.queue.dead_letter(failures)
+            
+            self._failing_since = None
+            self.queue.commit(path, offset, len(records))
+            self.batches += 1
+            self.last_flush_at = time.time()
+            self.last_batch_size = len(records)
+            self.last_batch_ms = round((time.perf_counter() - started_at) * 1000, 1)
+    
+    def stats(self):
+        return {
+            'batch_size': self.batch_size,
+            'flush_interval': self.flush_interval,
+            'batches': self.batches,
+            'errors': self.errors,
+            'last_error': self.last_error,
+            'dead_letter_after': self.dead_letter_after,
+            'failing_for': round(time.monotonic() - self._failing_since, 1) if self._failing_since is not None else None,
+            'last_flush_at': self.last_flush_at,
+            'last_batch_size': self.last_batch_size,
+            'last_batch_ms': self.last_batch_ms
+        }
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
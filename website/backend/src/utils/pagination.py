@@ -0,0 +1,58 @@
+import json
+from sqlalchemy import tuple_
+from src.utils.cursors import encode_cursor, decode_cursor, parse_cursor_datetime
+
+# Supported values for the `count` query parameter
+COUNT_MODES = ('exact', 'estimate', 'none')
+
+def clamp_per_page(per_page, maximum):
+    """Limit a requested page size to 1..maximum."""
+    return max(1, min(per_page, maximum))
+
+def keyset_page(query, created_column, id_column, after, per_page):
+    """Return one page of a newest-first listing ordered by (created_at, id), and the cursor for the next page.
+    
+    `after` is the cursor returned with the previous page, or an empty value for the first page.
+    Raises ValueError if the cursor is malformed.
+    """
+    if after:
+        cursor = decode_cursor(after)
+        try:
+            position = (parse_cursor_datetime(cursor['c']), int(cursor['i']))
+        except (KeyError, TypeError) as e:
+            raise ValueError('Invalid cursor') from e
+        query = query.filter(tuple_(created_column, id_column) < position)
+    
+    per_page = max(1, per_page)
+    items = query.order_by(created_column.desc(), id_column.desc()).limit(per_page + 1).all()
+    
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        last = items[-1]
+        next_cursor = encode_cursor({
+            'c': getattr(last, created_column.key),
+            'i': getattr(last, id_column.key)
+        })
+    
+    return items, next_cursor
+
+def estimate_count(query):
+    """Return the planner's row estimate for a query (PostgreSQL), falling back to an exact count."""
+    session = query.session
+    if session.get_bind().dialect.name != 'postgresql':
+        return query.order_by(None).count()
+    
+    compiled = query.order_by(None).statement.compile(dialect=session.get_bind().dialect)
+    plan = session.connection().exec_driver_sql(f'EXPLAIN (FORMAT JSON) {compiled}', compiled.params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+def count_rows(query, mode):
+    """Count the rows of a query according to a COUNT_MODES value (None for 'none')."""
+    if mode == 'none':
+        return None
+    if mode == 'estimate':
+        return estimate_count(query)
+    return query.order_by(None).count()
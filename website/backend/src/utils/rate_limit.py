@@ -0,0 +1,121 @@
+import math
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+# Outcome of a rate limit check. `remaining` is the number of whole requests left right now,
+# `reset_after` the seconds until the bucket is full again and `retry_after` the seconds until
+# a rejected request would be allowed (0 when allowed).
+RateLimitResult = namedtuple('RateLimitResult', ['allowed', 'limit', 'burst', 'remaining', 'reset_after', 'retry_after'])
+
+class MemoryRateLimitBackend:
+    """Token buckets kept in this process. Limits are per worker process, so with N workers a
+    client can get up to N times its quota; use a shared backend when that matters."""
+    
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+    
+    def take(self, key, rate, capacity, cost=1):
+        """Refill the bucket at `rate` tokens per second up to `capacity` and try to remove `cost`
+        tokens. Returns (allowed, tokens left)."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            
+            # Idle buckets are refilled anyway, so the least recently used ones can be dropped
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return allowed, tokens
+
+class RedisRateLimitBackend:
+    """Token buckets shared by every process through Redis, updated atomically by a Lua script.
+    
+    Any object with the same take() method (such as MemoryRateLimitBackend) can stand in for it.
+    """
+    
+    SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(state[1]) or capacity
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+    
+    def __init__(self, client, prefix='ratelimit:'):
+        self.prefix = prefix
+        self._script = client.register_script(self.SCRIPT)
+    
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        import redis  # Only needed when the shared backend is configured
+        return cls(redis.Redis.from_url(url, socket_timeout=0.5), **kwargs)
+    
+    def take(self, key, rate, capacity, cost=1):
+        allowed, tokens = self._script(keys=[self.prefix + key], args=[rate, capacity, cost])
+        return bool(allowed), float(tokens)
+
+class RateLimiter:
+    """Applies per-minute quotas with a burst allowance on top of a token bucket backend.
+    
+    If the backend fails, requests are let through (and counted) rather than rejected.
+    """
+    
+    def __init__(self, backend):
+        self.backend = backend
+        self.allowed = 0
+        self.limited = 0
+        self.backend_errors = 0
+    
+    def hit(self, key, per_minute, burst, cost=1):
+        rate = per_minute / 60.0
+        capacity = max(burst, cost)
+        
+        try:
+            allowed, tokens = self.backend.take(key, rate, capacity, cost)
+        except Exception:
+            self.backend_errors += 1
+            return None
+        
+        if allowed:
+            self.allowed += 1
+            retry_after = 0
+        else:
+            self.limited += 1
+            retry_after = max(1, math.ceil((cost - tokens) / rate))
+        
+        return RateLimitResult(
+            allowed=allowed,
+            limit=per_minute,
+            burst=capacity,
+            remaining=int(tokens),
+            reset_after=math.ceil((capacity - tokens) / rate),
+            retry_after=retry_after
+        )
+    
+    def stats(self):
+        return {
+            'backend': type(self.backend).__name__,
+            'allowed': self.allowed,
+            'limited': self.limited,
+            'backend_errors': self.backend_errors
+        }
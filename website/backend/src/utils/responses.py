@@ -0,0 +1,20 @@
+import gzip
+import json
+from flask import current_app, request
+
+# Payloads smaller than this aren't worth compressing
+GZIP_MIN_SIZE = 1024
+
+def accepts_gzip():
+    return 'gzip' in request.headers.get('Accept-Encoding', '').lower()
+
+def compact_json_response(payload, status=200):
+    """Serialize payload without whitespace and gzip it when the client accepts it."""
+    body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    headers = {'Vary': 'Accept-Encoding'}
+    
+    if accepts_gzip() and len(body) >= GZIP_MIN_SIZE:
+        body = gzip.compress(body)
+        headers['Content-Encoding'] = 'gzip'
+    
+    return current_app.response_class(body, status=status, mimetype='application/json', headers=headers)
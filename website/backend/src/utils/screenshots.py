@@ -0,0 +1,177 @@
+import hashlib
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageOps
+
+# Bytes read from the upload stream per iteration
+CHUNK_SIZE = 64 * 1024
+
+# Longest side of generated thumbnails, in pixels
+THUMBNAIL_SIZE = 320
+
+# Accepted image formats, identified by their leading bytes
+IMAGE_SIGNATURES = [
+    (b'\x89PNG\r\n\x1a\n', '.png', 'image/png'),
+    (b'\xff\xd8\xff', '.jpg', 'image/jpeg'),
+    (b'GIF87a', '.gif', 'image/gif'),
+    (b'GIF89a', '.gif', 'image/gif')
+]
+
+# Paths produced by screenshot_relative_path()
+CONTENT_HASHED_PATH = re.compile(r'^screenshots/[0-9a-f]{2}/[0-9a-f]{64}\.[a-z]+$')
+
+class ScreenshotError(Exception):
+    pass
+
+class ScreenshotTooLarge(ScreenshotError):
+    pass
+
+class UnsupportedScreenshot(ScreenshotError):
+    pass
+
+def detect_image_type(header):
+    for signature, extension, mime_type in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return extension, mime_type
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return '.webp', 'image/webp'
+    return None
+
+def screenshot_relative_path(content_hash, extension):
+    # Fan out over 256 sub-directories so no single directory grows too large
+    return os.path.join('screenshots', content_hash[:2], content_hash + extension)
+
+def is_content_addressed(relative_path):
+    """True for screenshots named by the hash of their bytes (not their thumbnails or legacy uploads)."""
+    return CONTENT_HASHED_PATH.match(relative_path.replace(os.sep, '/')) is not None
+
+def thumbnail_relative_path(relative_path):
+    base, _ = os.path.splitext(relative_path)
+    return base + '_thumb.jpg'
+
+def normalized_relative_path(relative_path):
+    base, extension = os.path.splitext(relative_path)
+    return base + '_normalized' + extension
+
+def stage_upload(stream, static_folder, max_bytes):
+    """Stream an upload to a temporary file while hashing it, and name it by the SHA-256 of its bytes.
+    
+    Only the size and the image signature are checked here; decoding is left to process_screenshot().
+    Returns (content_hash, relative_path, size, mime_type, temp_path); pass temp_path to
+    place_upload() or discard_upload(). Raises ScreenshotTooLarge or UnsupportedScreenshot.
+    """
+    screenshots_dir = os.path.join(static_folder, 'screenshots')
+    os.makedirs(screenshots_dir, exist_ok=True)
+    
+    digest = hashlib.sha256()
+    size = 0
+    header = b''
+    
+    handle, temp_path = tempfile.mkstemp(dir=screenshots_dir, prefix='.upload-')
+    try:
+        with os.fdopen(handle, 'wb') as temp_file:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ScreenshotTooLarge(f'Screenshot exceeds {max_bytes} bytes')
+                
+                if len(header) < 16:
+                    header += chunk[:16 - len(header)]
+                digest.update(chunk)
+                temp_file.write(chunk)
+        
+        image_type = detect_image_type(header)
+        if image_type is None:
+            raise UnsupportedScreenshot('Screenshot must be a PNG, JPEG, GIF or WebP image')
+        extension, mime_type = image_type
+        
+        content_hash = digest.hexdigest()
+        return content_hash, screenshot_relative_path(content_hash, extension), size, mime_type, temp_path
+    except BaseException:
+        discard_upload(temp_path)
+        raise
+
+def place_upload(static_folder, temp_path, relative_path, replace=False):
+    """Move a staged upload to its final path. Returns True if the file was written.
+    
+    Unless `replace` is set, the staged file is discarded when identical bytes are already stored.
+    """
+    file_path = os.path.join(static_folder, relative_path)
+    if not replace and os.path.exists(file_path):
+        discard_upload(temp_path)
+        return False
+    
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    os.replace(temp_path, file_path)
+    return True
+
+def discard_upload(temp_path):
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+def process_screenshot(static_folder, relative_path):
+    """Write the thumbnail of a stored screenshot, and a normalized copy if it carries EXIF data.
+    
+    The normalized copy is rotated to the EXIF orientation and stripped of metadata (screenshots
+    usually have none, and animated images are kept as uploaded). The screenshot itself is never
+    modified, so its name stays the hash of its bytes. Returns the relative path of the normalized
+    copy, or None if none was needed.
+    """
+    file_path = os.path.join(static_folder, relative_path)
+    normalized_path = None
+    
+    with Image.open(file_path) as image:
+        oriented = image
+        if not getattr(image, 'is_animated', False) and image.getexif():
+            oriented = ImageOps.exif_transpose(image)
+            options = {'icc_profile': image.info['icc_profile']} if image.info.get('icc_profile') else {}
+            if image.format == 'JPEG':
+                options['quality'] = 95
+            normalized_path = normalized_relative_path(relative_path)
+            oriented.save(os.path.join(static_folder, normalized_path), format=image.format, **options)
+        
+        # Animated images are thumbnailed from their first frame
+        thumbnail = oriented.convert('RGB')
+        thumbnail.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        thumbnail.save(os.path.join(static_folder, thumbnail_relative_path(relative_path)), format='JPEG', quality=80)
+    
+    return normalized_path
+
+def remove_screenshot_files(static_folder, relative_path):
+    for path in [relative_path, thumbnail_relative_path(relative_path), normalized_relative_path(relative_path)]:
+        file_path = os.path.join(static_folder, path)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+class ScreenshotProcessor:
+    """Worker pool that runs screenshot post-processing off the request thread."""
+    
+    def __init__(self, max_workers=2):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='screenshot-worker')
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+    
+    def _run(self, function, *args):
+        try:
+            function(*args)
+            self.completed += 1
+        except Exception:
+            self.failed += 1
+    
+    def submit(self, function, *args):
+        self.submitted += 1
+        return self._executor.submit(self._run, function, *args)
+    
+    def stats(self):
+        return {
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed
+        }
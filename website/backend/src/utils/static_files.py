@@ -0,0 +1,149 @@
+import mimetypes
+import os
+import threading
+from flask import current_app, request
+from werkzeug.security import safe_join
+from werkzeug.wsgi import wrap_file
+from src.utils.screenshots import CONTENT_HASHED_PATH
+
+# Cache lifetime for files whose URL changes whenever their content does
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Supported ways of handing the actual file transfer to a front proxy
+SENDFILE_MODES = ('x-accel-redirect', 'x-sendfile')
+
+class StaticManifest:
+    """In-memory index of the files under a static folder, built once at startup.
+    
+    Lookups never touch the filesystem, except for paths under `dynamic_prefixes`
+    (directories written to at runtime, such as uploaded screenshots), which are
+    added to the manifest the first time they are requested. Files under
+    `immutable_prefixes` (build assets with hashed names) or matching one of
+    `immutable_patterns` (screenshots named by their content hash) are
+    content-addressed and may be cached forever.
+    """
+    
+    def __init__(self, root, immutable_prefixes=('assets/',), immutable_patterns=(CONTENT_HASHED_PATH,),
+                 dynamic_prefixes=('screenshots/',)):
+        self.root = root
+        self.immutable_prefixes = tuple(immutable_prefixes)
+        self.immutable_patterns = tuple(immutable_patterns)
+        self.dynamic_prefixes = tuple(dynamic_prefixes)
+        self._files = {}
+        self._lock = threading.Lock()
+        self.startup_count = 0
+    
+    def _entry(self, relative_path, file_path, stat):
+        return {
+            'relative_path': relative_path,
+            'path': file_path,
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'mtime_ns': stat.st_mtime_ns,
+            'etag': f'{stat.st_mtime_ns:x}-{stat.st_size:x}',
+            'mimetype': mimetypes.guess_type(relative_path)[0] or 'application/octet-stream',
+            'immutable': self._is_immutable(relative_path)
+        }
+    
+    def _is_immutable(self, relative_path):
+        if relative_path.startswith(self.immutable_prefixes):
+            return True
+        return any(pattern.match(relative_path) for pattern in self.immutable_patterns)
+    
+    def build(self):
+        files = {}
+        for directory, subdirectories, filenames in os.walk(self.root):
+            # Skip hidden files, including in-progress uploads
+            subdirectories[:] = [name for name in subdirectories if not name.startswith('.')]
+            for filename in filenames:
+                if filename.startswith('.'):
+                    continue
+                
+                file_path = os.path.join(directory, filename)
+                relative_path = os.path.relpath(file_path, self.root).replace(os.sep, '/')
+                files[relative_path] = self._entry(relative_path, file_path, os.stat(file_path))
+        
+        with self._lock:
+            self._files = files
+            self.startup_count = len(files)
+    
+    def get(self, relative_path):
+        entry = self._files.get(relative_path)
+        if entry is not None or not relative_path.startswith(self.dynamic_prefixes):
+            return entry
+        
+        # Written after startup (e.g. a new screenshot)
+        file_path = safe_join(self.root, relative_path)
+        if file_path is None or os.path.basename(file_path).startswith('.'):
+            return None
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        
+        entry = self._entry(relative_path, file_path, stat)
+        with self._lock:
+            self._files[relative_path] = entry
+        return entry
+    
+    def update(self, entry, stat):
+        # Refresh an entry whose file was rewritten in place
+        if stat.st_mtime_ns != entry['mtime_ns'] or stat.st_size != entry['size']:
+            entry = self._entry(entry['relative_path'], entry['path'], stat)
+            with self._lock:
+                self._files[entry['relative_path']] = entry
+        return entry
+    
+    def discard(self, relative_path):
+        with self._lock:
+            self._files.pop(relative_path, None)
+    
+    def stats(self):
+        return {
+            'files': len(self._files),
+            'files_at_startup': self.startup_count
+        }
+
+def _apply_cache_headers(response, entry):
+    if entry['immutable']:
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        # Cheap to revalidate thanks to the ETag
+        response.cache_control.no_cache = True
+    response.set_etag(entry['etag'])
+    response.last_modified = entry['mtime']
+
+def static_file_response(manifest, entry, sendfile_mode=None, accel_prefix='/protected-static/'):
+    """Build a conditional (ETag / If-None-Match / Range) response for a manifest entry.
+    
+    With `sendfile_mode` set, only headers are produced and the front proxy sends the bytes.
+    Returns None if the file disappeared since it was indexed.
+    """
+    if sendfile_mode:
+        response = current_app.response_class(mimetype=entry['mimetype'])
+        if sendfile_mode == 'x-accel-redirect':
+            response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + entry['relative_path']
+        else:
+            response.headers['X-Sendfile'] = entry['path']
+        _apply_cache_headers(response, entry)
+        return response.make_conditional(request)
+    
+    try:
+        file = open(entry['path'], 'rb')
+    except OSError:
+        manifest.discard(entry['relative_path'])
+        return None
+    
+    # fstat on the open file is cheap and catches files rewritten in place since they were indexed
+    entry = manifest.update(entry, os.fstat(file.fileno()))
+    
+    response = current_app.response_class(
+        wrap_file(request.environ, file),
+        mimetype=entry['mimetype'],
+        direct_passthrough=True
+    )
+    response.content_length = entry['size']
+    _apply_cache_headers(response, entry)
+    return response.make_conditional(request, accept_ranges=True, complete_length=entry['size'])
@@ -0,0 +1,163 @@
+import heapq
+import threading
+import time
+from array import array
+
+# Window name suffixes -> seconds
+DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+def parse_duration(value):
+    """Parse durations such as '90s', '15m', '1h' or '7d' into seconds."""
+    value = value.strip().lower()
+    if len(value) < 2 or value[-1] not in DURATION_UNITS or not value[:-1].isdigit() or int(value[:-1]) <= 0:
+        raise ValueError(f'Invalid duration: {value!r}')
+    return int(value[:-1]) * DURATION_UNITS[value[-1]]
+
+class SlidingWindowSketch:
+    """Approximate per-key counts over the last `window` seconds in a fixed amount of memory.
+    
+    A count-min sketch holds the counts for the whole window. The window is split into `slots`
+    time slots that remember which sketch cells they incremented, so an expiring slot is
+    subtracted cell by cell. Counts are never underestimated and are overestimated by at most
+    about 2/width of the window total with probability 1 - 0.5^depth.
+    
+    Keys are expected to be hex-encoded hashes (such as FlaggedContent.url_hash); the cell
+    positions are derived from the digest itself by double hashing. Not thread-safe on its own.
+    """
+    
+    def __init__(self, window, slots=30, width=4096, depth=4):
+        if window <= 0 or slots <= 0:
+            raise ValueError('window and slots must be positive')
+        
+        self.window = window
+        self.slot_seconds = window / slots
+        self.num_slots = slots
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        
+        self._cells = array('q', bytes(8 * width * depth))
+        self._slots = {}  # slot number -> {cell: count}
+        self._first_live = None
+    
+    def _positions(self, digest):
+        h1 = int(digest[:16], 16)
+        h2 = int(digest[16:32], 16) | 1
+        return [row * self.width + (h1 + row * h2) % self.width for row in range(self.depth)]
+    
+    def expire(self, now):
+        """Drop the slots that have fallen out of the window ending at `now`. Returns True if any were dropped."""
+        first_live = int(now // self.slot_seconds) - self.num_slots + 1
+        if self._first_live is not None and first_live <= self._first_live:
+            return False
+        self._first_live = first_live
+        
+        expired = [slot for slot in self._slots if slot < first_live]
+        cells = self._cells
+        for slot in expired:
+            for cell, count in self._slots.pop(slot).items():
+                cells[cell] -= count
+                # Every count lands in exactly one cell of the first row
+                if cell < self.width:
+                    self.total -= count
+        return bool(expired)
+    
+    def add(self, digest, at, count=1):
+        """Count `digest` at time `at`. Returns False if `at` is before the window last passed to expire()."""
+        slot = int(at // self.slot_seconds)
+        if self._first_live is not None and slot < self._first_live:
+            return False
+        
+        slot_cells = self._slots.setdefault(slot, {})
+        cells = self._cells
+        for cell in self._positions(digest):
+            cells[cell] += count
+            slot_cells[cell] = slot_cells.get(cell, 0) + count
+        self.total += count
+        return True
+    
+    def estimate(self, digest):
+        cells = self._cells
+        return min(cells[cell] for cell in self._positions(digest))
+
+class TrendingTracker:
+    """Finds the keys counted most often over several sliding windows, e.g. {'15m': 900, '1h': 3600}.
+    
+    Each window pairs a SlidingWindowSketch with a bounded set of candidate keys: a key joins
+    the candidates when its estimate beats the weakest candidate, and the set is trimmed back to
+    `candidates` keys by re-estimating them. Recording a key costs a few array updates per window
+    and reading the top keys touches only the candidates, so memory and time don't grow with the
+    number of distinct keys. All state lives in this process.
+    """
+    
+    def __init__(self, windows, slots=30, width=4096, depth=4, candidates=500):
+        if not windows:
+            raise ValueError('At least one window is required')
+        
+        self.windows = dict(windows)
+        self.candidates = candidates
+        self._sketches = {name: SlidingWindowSketch(seconds, slots, width, depth) for name, seconds in self.windows.items()}
+        self._candidates = {name: {} for name in self.windows}  # window -> {key: estimate when last seen}
+        self._thresholds = {name: 0 for name in self.windows}
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.dropped = 0
+    
+    def record(self, key, at=None, count=1):
+        """Count `key` (a hex digest) at wall-clock time `at` (defaults to now)."""
+        now = time.time()
+        at = now if at is None else min(at, now)
+        
+        with self._lock:
+            self.recorded += count
+            for name, sketch in self._sketches.items():
+                # Estimates only fall when slots expire, so the bar for new candidates is reset
+                if sketch.expire(now):
+                    self._thresholds[name] = 0
+                if not sketch.add(key, at, count):
+                    self.dropped += count
+                    continue
+                
+                estimate = sketch.estimate(key)
+                candidates = self._candidates[name]
+                if key in candidates or len(candidates) < self.candidates or estimate > self._thresholds[name]:
+                    candidates[key] = estimate
+                    # Let the set grow by a quarter before trimming, so trimming is amortized
+                    if len(candidates) > self.candidates + self.candidates // 4:
+                        self._trim(name)
+    
+    def _trim(self, name):
+        sketch = self._sketches[name]
+        candidates = self._candidates[name]
+        estimates = {key: sketch.estimate(key) for key in candidates}
+        kept = heapq.nlargest(self.candidates, (item for item in estimates.items() if item[1] > 0), key=lambda item: item[1])
+        
+        self._candidates[name] = dict(kept)
+        self._thresholds[name] = kept[-1][1] if len(kept) >= self.candidates else 0
+    
+    def top(self, window, limit=None):
+        """Return [(key, estimated count)] for the keys counted most often in `window`, highest first."""
+        now = time.time()
+        with self._lock:
+            sketch = self._sketches[window]
+            sketch.expire(now)
+            self._trim(window)
+            return list(self._candidates[window].items())[:limit]
+    
+    def counts(self, keys):
+        """Return {key: {window: estimated count}} for the given keys."""
+        now = time.time()
+        with self._lock:
+            for sketch in self._sketches.values():
+                sketch.expire(now)
+            return {key: {name: sketch.estimate(key) for name, sketch in self._sketches.items()} for key in keys}
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'windows': self.windows,
+                'recorded': self.recorded,
+                'dropped': self.dropped,
+                'window_totals': {name: sketch.total for name, sketch in self._sketches.items()},
+                'candidates': {name: len(candidates) for name, candidates in self._candidates.items()}
+            }
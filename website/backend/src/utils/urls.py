@@ -0,0 +1,102 @@
+import hashlib
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Query parameters that only carry tracking information and never change the content
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'gbraid', 'wbraid', 'msclkid', 'yclid', 'igshid',
+    'mc_cid', 'mc_eid', '_ga', '_gl', 'ref_src', 'spm'
+}
+TRACKING_PREFIXES = ('utm_',)
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+def is_tracking_param(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+def canonicalize_url(url):
+    """Return the canonical form of a URL used for lookups and de-duplication."""
+    url = (url or '').strip()
+
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+
+    # Leave anything that isn't an absolute URL untouched
+    if not parts.scheme or not parts.netloc:
+        return url
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').rstrip('.')
+    if ':' in host:
+        host = f'[{host}]'  # IPv6 literal
+
+    netloc = host
+    if port and port != DEFAULT_PORTS.get(scheme):
+        netloc = f'{host}:{port}'
+    if parts.username:
+        userinfo = parts.username
+        if parts.password:
+            userinfo += f':{parts.password}'
+        netloc = f'{userinfo}@{netloc}'
+
+    # Drop tracking parameters and sort the rest so equivalent URLs compare equal
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not is_tracking_param(key)
+    ]
+    query.sort()
+
+    return urlunsplit((scheme, netloc, parts.path or '/', urlencode(query), ''))
+
+def hash_url(url):
+    """Return the fixed-width SHA-256 hex digest of the canonical form of a URL."""
+    return hashlib.sha256(canonicalize_url(url).encode('utf-8')).hexdigest()
+
+# Multi-label public suffixes under which sites register their own names. This is the commonly
+# seen subset of the Public Suffix List; for any other host the last two labels are used.
+MULTI_LABEL_SUFFIXES = {
+    'co.uk', 'org.uk', 'ac.uk', 'gov.uk', 'me.uk', 'ltd.uk', 'plc.uk', 'net.uk', 'sch.uk', 'nhs.uk',
+    'com.au', 'net.au', 'org.au', 'edu.au', 'gov.au', 'asn.au', 'id.au',
+    'co.nz', 'org.nz', 'net.nz', 'govt.nz', 'ac.nz',
+    'co.jp', 'ne.jp', 'or.jp', 'ac.jp', 'go.jp',
+    'co.kr', 'or.kr', 'go.kr',
+    'co.in', 'net.in', 'org.in', 'gov.in', 'ac.in', 'edu.in',
+    'com.br', 'net.br', 'org.br', 'gov.br', 'edu.br',
+    'com.ar', 'com.mx', 'com.co', 'com.pe', 'com.ve', 'com.uy', 'com.ec',
+    'com.cn', 'net.cn', 'org.cn', 'gov.cn', 'edu.cn',
+    'com.hk', 'org.hk', 'edu.hk', 'gov.hk',
+    'com.tw', 'org.tw', 'edu.tw', 'gov.tw',
+    'com.sg', 'edu.sg', 'gov.sg', 'org.sg',
+    'com.my', 'org.my', 'gov.my',
+    'co.id', 'or.id', 'go.id', 'ac.id',
+    'com.ph', 'gov.ph', 'com.vn', 'com.pk', 'com.bd', 'com.np', 'com.lk',
+    'co.za', 'org.za', 'gov.za', 'ac.za',
+    'com.ng', 'gov.ng', 'co.ke', 'or.ke', 'com.eg', 'co.il', 'org.il', 'ac.il', 'gov.il',
+    'com.tr', 'gov.tr', 'org.tr', 'com.sa', 'gov.sa', 'com.ua', 'gov.ua', 'com.pl', 'com.ru',
+    'co.th', 'ac.th', 'go.th', 'or.th',
+    'github.io', 'gitlab.io', 'blogspot.com', 'wordpress.com', 'herokuapp.com', 'netlify.app',
+    'vercel.app', 'pages.dev', 'substack.com', 'medium.com', 'tumblr.com', 'appspot.com'
+}
+
+def registrable_domain(url):
+    """Return the registrable domain (e.g. 'bbc.co.uk' for 'https://news.bbc.co.uk/x'), or None."""
+    try:
+        host = urlsplit((url or '').strip()).hostname
+    except ValueError:
+        return None
+    
+    if not host:
+        return None
+    
+    host = host.rstrip('.')
+    labels = host.split('.')
+    
+    # IP addresses and single-label hosts have no public suffix
+    if ':' in host or len(labels) < 2 or labels[-1].isdigit():
+        return host
+    
+    suffix_labels = 2 if '.'.join(labels[-2:]) in MULTI_LABEL_SUFFIXES else 1
+    return '.'.join(labels[-(suffix_labels + 1):])
@@ -0,0 +1,81 @@
+import atexit
+import threading
+import time
+
+class WriteBehindBuffer:
+    """Keeps the latest value recorded per key and hands them to `flush(values)` in one call.
+    
+    A daemon thread flushes every `interval` seconds (and once more at interpreter exit), so
+    callers only pay for a dictionary update. Pass the Flask app to start() to run flushes
+    inside an application context. Values from a failed flush are kept for the next
+    attempt unless a newer value was recorded in the meantime.
+    """
+    
+    def __init__(self, flush, interval=30.0, name='write-behind-buffer'):
+        self.flush = flush
+        self.interval = interval
+        self.name = name
+        self._values = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._app = None
+        self.recorded = 0
+        self.flushes = 0
+        self.flushed = 0
+        self.errors = 0
+        self.last_error = None
+        self.last_flush_at = None
+    
+    def record(self, key, value):
+        with self._lock:
+            self._values[key] = value
+            self.recorded += 1
+    
+    def start(self, app=None):
+        if self._thread is not None:
+            return
+        self._app = app
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        atexit.register(self.flush_now)
+    
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush_now()
+    
+    def flush_now(self):
+        with self._lock:
+            values, self._values = self._values, {}
+        if not values:
+            return
+        
+        try:
+            if self._app is not None:
+                with self._app.app_context():
+                    self.flush(values)
+            else:
+                self.flush(values)
+        except Exception as e:
+            self.errors += 1
+            self.last_error = str(e)
+            with self._lock:
+                for key, value in values.items():
+                    self._values.setdefault(key, value)
+            return
+        
+        self.flushes += 1
+        self.flushed += len(values)
+        self.last_flush_at = time.time()
+    
+    def stats(self):
+        return {
+            'interval': self.interval,
+            'pending': len(self._values),
+            'recorded': self.recorded,
+            'flushes': self.flushes,
+            'flushed': self.flushed,
+            'errors': self.errors,
+            'last_error': self.last_error,
+            'last_flush_at': self.last_flush_at
+        }
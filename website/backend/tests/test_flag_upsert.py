@@ -0,0 +1,92 @@
+import os
+import threading
+import pytest
+from flask import Flask
+from sqlalchemy.exc import OperationalError
+from src.models import db, FlaggedContent
+
+THREADS = 8
+SUBMISSIONS_PER_THREAD = 25
+
+@pytest.fixture
+def app(tmp_path):
+    # Runs against TEST_DATABASE_URL (e.g. a scratch PostgreSQL database) when set, otherwise a
+    # file-backed SQLite database so every thread gets its own connection
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('TEST_DATABASE_URL', f"sqlite:///{tmp_path / 'upsert.db'}")
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 30}}
+    db.init_app(app)
+    
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+def submit(app, url, results):
+    with app.app_context():
+        for _ in range(SUBMISSIONS_PER_THREAD):
+            while True:
+                try:
+                    _, created = FlaggedContent.upsert(url, 'article')
+                    db.session.commit()
+                    break
+                except OperationalError:
+                    # SQLite reports "database is locked" when its busy timeout runs out
+                    db.session.rollback()
+            results.append(created)
+
+def test_concurrent_upserts_of_equivalent_urls_share_one_row(app):
+    # Different spellings of the same canonical URL
+    urls = [
+        'https://Example.com/story?b=2&a=1',
+        'https://example.com:443/story?a=1&b=2&utm_source=feed',
+        'https://example.com/story?a=1&b=2'
+    ]
+    results = []
+    threads = [threading.Thread(target=submit, args=(app, urls[i % len(urls)], results)) for i in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    with app.app_context():
+        rows = FlaggedContent.query.all()
+        assert len(rows) == 1
+        assert rows[0].flag_count == THREADS * SUBMISSIONS_PER_THREAD
+    
+    assert len(results) == THREADS * SUBMISSIONS_PER_THREAD
+    assert results.count(True) == 1
+
+def test_upsert_reports_existing_row_whose_count_equals_the_increment(app):
+    with app.app_context():
+        _, created = FlaggedContent.upsert('https://example.com/a', 'article')
+        db.session.commit()
+        assert created
+        
+        FlaggedContent.query.update({FlaggedContent.flag_count: 0})
+        db.session.commit()
+        
+        flagged_content, created = FlaggedContent.upsert('https://example.com/a', 'article')
+        db.session.commit()
+        assert not created
+        assert flagged_content.flag_count == 1
+
+def test_upsert_many_reports_created_rows(app):
+    with app.app_context():
+        FlaggedContent.upsert('https://example.com/a', 'article', flag_increment=2)
+        db.session.commit()
+        
+        upserted = FlaggedContent.upsert_many([
+            {'url': 'https://example.com/a', 'content_type': 'article', 'flag_count': 2},
+            {'url': 'https://example.com/b', 'content_type': 'article', 'flag_count': 3}
+        ])
+        db.session.commit()
+        
+        created = {db.session.get(FlaggedContent, content_id).url: created for content_id, _, created, _, _ in upserted.values()}
+        assert created == {'https://example.com/a': False, 'https://example.com/b': True}
+        assert {row.url: row.flag_count for row in FlaggedContent.query} == {
+            'https://example.com/a': 4,
+            'https://example.com/b': 3
+        }